@@ -0,0 +1,81 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Canned Answer Table
+Client: Global Finance Corp (GFC)
+
+Dispatch table for the rule-based tier: prepared questions map to fixed
+answers through one dict lookup on a normalised key, so "what was
+microsoft's revenue in 2024" and "What was Microsoft's revenue in 2024?"
+hit the same entry. The table is loaded from a JSON-lines file, one
+{"query": ..., "response": ...} object per line, and can hold thousands of
+pairs at the same lookup cost.
+
+The simple chatbot answers only from this table; the NLP chatbot checks
+it before parsing (enable_canned_answers), skipping spaCy on a hit.
+
+Standard library only, so it ships next to simple_chatbot.py. The NLP
+chatbot's tokeniser (vocabulary_matcher) is built on TOKEN_PATTERN, so a
+question hits the table exactly when the parser would see the same words.
+"""
+
+import json
+import os
+import re
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CANNED_PATH = os.path.join(BASE_DIR, 'canned_answers.jsonl')
+
+# Words, numbers and the percent sign; apostrophes split tokens ("apple's")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|%")
+
+
+def normalize_key(query):
+    """Lookup key for a query: its lower-case tokens joined by single spaces"""
+    return ' '.join(TOKEN_PATTERN.findall(query.lower()))
+
+
+class CannedAnswers:
+    """
+    Normalised-question -> answer table with hit/miss counters
+    """
+    def __init__(self, pairs=()):
+        self.hits = 0
+        self.misses = 0
+        self._answers = {}
+        self._lock = threading.Lock()
+        for query, response in pairs:
+            self.add(query, response)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CANNED_PATH):
+        """Table from a JSON-lines file of {"query", "response"} objects (blank lines skipped)"""
+        with open(path, encoding='utf-8') as f:
+            rows = (json.loads(line) for line in f if line.strip())
+            return cls((row['query'], row['response']) for row in rows)
+
+    def add(self, query, response):
+        self._answers[normalize_key(query)] = response
+
+    def lookup(self, query):
+        """The answer for query, or None if it is not in the table"""
+        response = self._answers.get(normalize_key(query))
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def __len__(self):
+        return len(self._answers)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._answers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
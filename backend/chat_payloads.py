@@ -0,0 +1,91 @@
+"""
+Compact response objects for the JSON API.
+
+Handlers build a ChatResponse rather than nested dicts. Chart points are
+held column-wise in a ChartSeries: the store's interned names plus one
+float64 vector per value key, NaN where a value is missing. A 5,000-row
+comparison is then a handful of objects instead of 5,000 dicts, both while
+it is rendered and while it sits in the response cache.
+
+The dict form is built only at the edge, by to_dict() or encode():
+
+    {"text": ..., "visualization": {"type": ..., "title": ...,
+                                    "data": [{"name": ..., "value": ...}, ...],
+                                    "yLabel": ...}}
+"""
+
+from financial_store import python_values
+from json_encoding import encode_json
+
+
+class ChartSeries:
+    """
+    Chart points as columns
+
+    names label the points (companies or years); values is a float64
+    vector, shown as ints when integral; extra holds (key, values,
+    integral) for further per-point metrics.
+    """
+    __slots__ = ('names', 'values', 'integral', 'extra')
+
+    def __init__(self, names, values, integral=False, extra=()):
+        self.names = names
+        self.values = values
+        self.integral = integral
+        self.extra = extra
+
+    def __len__(self):
+        return len(self.names)
+
+    def slice(self, start, stop):
+        return ChartSeries(self.names[start:stop], self.values[start:stop], self.integral,
+                           tuple((key, values[start:stop], integral) for key, values, integral in self.extra))
+
+    def value_list(self):
+        """Python values of the "value" column (None when missing)"""
+        return python_values(self.values, self.integral)
+
+    def points(self):
+        """[{"name": ..., "value": ..., <extra key>: ...}, ...]"""
+        points = [{"name": name, "value": value} for name, value in zip(self.names, self.value_list())]
+        for key, values, integral in self.extra:
+            for point, value in zip(points, python_values(values, integral)):
+                point[key] = value
+        return points
+
+
+class Visualization:
+    """A chart: its type ("bar" or "line"), title, points and optional y-axis label"""
+    __slots__ = ('type', 'title', 'series', 'y_label')
+
+    def __init__(self, type, title, series, y_label=None):
+        self.type = type
+        self.title = title
+        self.series = series
+        self.y_label = y_label
+
+    def to_dict(self, data=True):
+        """The visualization as sent to the UI (without "data" when data is False)"""
+        viz = {"type": self.type, "title": self.title}
+        if data:
+            viz["data"] = self.series.points()
+        if self.y_label is not None:
+            viz["yLabel"] = self.y_label
+        return viz
+
+
+class ChatResponse:
+    """Text answer plus an optional Visualization"""
+    __slots__ = ('text', 'visualization')
+
+    def __init__(self, text, visualization=None):
+        self.text = text
+        self.visualization = visualization
+
+    def to_dict(self):
+        viz = self.visualization
+        return {"text": self.text, "visualization": viz.to_dict() if viz is not None else None}
+
+    def encode(self):
+        """The response as JSON bytes; the point dicts only live until they are encoded"""
+        return encode_json(self.to_dict())
@@ -1,119 +1,240 @@
+import itertools
 import sys
 import os
 
-# Add parent directory to path to import nlp_chatbot
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path to import nlp_chatbot (once; a deployment
+# can also put it on PYTHONPATH)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import numpy as np
 
 from nlp_chatbot import NLPFinancialChatbot
+from chat_payloads import ChartSeries, ChatResponse, Visualization
+from instrumentation import timed
+from metric_registry import metric_info
+from nlp_pipeline import get_nlp
+from query_plan import QueryPlan
+
+# Sentinel for "value not prefetched yet" (None already means "no data")
+MISSING = object()
+
+# Rows listed in the first streamed text event; the rest only go out as data chunks
+STREAM_SUMMARY_ROWS = 5
 
 class ChatbotJSONAdapter(NLPFinancialChatbot):
     """
     Adapter to return JSON responses for the UI instead of string printouts.
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, data_path=None):
+        super().__init__(data_path)
+
+    def parse_query(self, query, doc=None):
+        """
+        Detect intent and entities in one pass; returns a ParsedQuery
+        """
+        return self.parse(query, doc)
 
     def process_query_json(self, query):
         """
         Process query and return JSON structure
         """
-        # Detect intent and entities
-        intent = self.detect_intent(query)
-        company = self.extract_company(query)
-        year = self.extract_year(query)
-        metric = self.extract_metric(query)
-
-        response_data = {
-            "text": "",
-            "visualization": None
+        answer = self.canned_json(query)
+        if answer is not None:
+            return answer
+        return self.render_json(self.parse_query(query))
+
+    def canned_response(self, query):
+        """ChatResponse for a canned answer to query, or None"""
+        answer = self.canned_answer(query)
+        if answer is None:
+            return None
+        return ChatResponse(answer.strip())
+
+    def canned_json(self, query):
+        """JSON structure for a canned answer to query, or None"""
+        answer = self.canned_response(query)
+        return answer.to_dict() if answer is not None else None
+
+    def process_queries_json(self, queries, batch_size=64, n_process=1):
+        """
+        Process a list of queries in one pass and return a list of JSON structures.
+
+        Queries that still need NER after the direct ticker lookup and the
+        org pre-filter go through a single nlp.pipe call, and all single
+        metric lookups are fetched from the store in one vectorised read.
+        Canned answers are taken from the table and skip all of that.
+        """
+        canned = [self.canned_json(query) for query in queries]
+        ner_positions = [i for i, query in enumerate(queries) if canned[i] is None and self.needs_ner(query)]
+        docs = {}
+        if ner_positions:
+            texts = [queries[i] for i in ner_positions]
+            docs = dict(zip(ner_positions, get_nlp().pipe(texts, batch_size=batch_size, n_process=n_process)))
+
+        parsed = [self.parse_query(query, docs.get(i)) if canned[i] is None else None
+                  for i, query in enumerate(queries)]
+
+        # Batch every get_metric lookup into one fancy-indexed read
+        lookups = [i for i, parse in enumerate(parsed) if parse is not None and parse.intent == 'get_metric'
+                   and not parse.is_screen and parse.company and parse.metric]
+        values = self.store.get_many([(parsed[i].company, parsed[i].year, parsed[i].metric) for i in lookups])
+        prefetched = dict(zip(lookups, values))
+
+        return [canned[i] if parse is None else self.render_json(parse, value=prefetched.get(i, MISSING))
+                for i, parse in enumerate(parsed)]
+
+    def stream_json(self, parsed, chunk_size=200):
+        """
+        Yield the response for a parsed query as a sequence of events:
+
+            {"type": "parsed", "intent": ..., "companies": [...], ...}
+            {"type": "text", "text": ..., "visualization": {...without "data"}}
+            {"type": "data", "points": [...]}      (one per chunk)
+            {"type": "done", "points": total}
+
+        Comparisons summarise only their first STREAM_SUMMARY_ROWS rows in
+        the text event and render the remaining rows chunk by chunk, so the
+        first events cost the same however many companies a query covers.
+        """
+        yield {
+            "type": "parsed",
+            "intent": parsed.intent,
+            "companies": list(parsed.companies),
+            "metrics": list(parsed.metrics),
+            "year_start": parsed.year_start,
+            "year_end": parsed.year_end,
+            "confidence": parsed.confidence,
         }
 
+        plan = QueryPlan.from_parsed(parsed) if parsed.is_screen and parsed.intent != 'trend' else None
+        result = plan.execute(self.store) if plan is not None and plan.sort_metric else None
+        if result is not None and len(result):
+            head = self._compare_series(result.slice(0, STREAM_SUMMARY_ROWS))
+            response = self._compare_response(plan, head, more=len(result) - len(head))
+            rest = result.slice(len(head), None)
+            chunks = itertools.chain([head], (self._compare_series(rest.slice(start, start + chunk_size))
+                                              for start in range(0, len(rest), chunk_size)))
+        else:
+            response = self.render_response(parsed)
+            series = response.visualization.series if response.visualization else ()
+            chunks = (series.slice(start, start + chunk_size) for start in range(0, len(series), chunk_size))
+
+        viz = response.visualization
+        yield {
+            "type": "text",
+            "text": response.text,
+            "visualization": viz.to_dict(data=False) if viz else None,
+        }
+
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            yield {"type": "data", "points": chunk.points()}
+        yield {"type": "done", "points": total}
+
+    @timed('render')
+    def render_response(self, parsed, value=MISSING):
+        """
+        Build the ChatResponse for an already parsed query
+        """
+        intent, company, year, metric = parsed.intent, parsed.company, parsed.year, parsed.metric
+        response = ChatResponse("")
+
         # Logic similar to process_query but returning data
-        if intent == 'compare' or intent == 'ranking':
-            response_data = self._handle_compare_json(metric, year)
-        elif intent == 'trend':
-            response_data = self._handle_trend_json(company, metric)
+        if intent == 'trend':
+            if parsed.is_range:
+                response = self._handle_trend_json(company, metric, parsed.year_start, parsed.year_end)
+            else:
+                response = self._handle_trend_json(company, metric)
+        elif parsed.is_screen:
+            response = self._handle_compare_json(metric, year, QueryPlan.from_parsed(parsed))
         elif intent == 'get_metric':
             if company and metric:
-                response_data = self._handle_get_metric_json(company, year, metric)
+                response = self._handle_get_metric_json(company, year, metric, value)
             else:
-                 response_data["text"] = "I couldn't understand the company or metric. Please try again."
+                 response.text = "I couldn't understand the company or metric. Please try again."
         else:
-            response_data["text"] = self.provide_help()
+            response.text = self.provide_help()
 
-        if not response_data["text"] and not response_data["visualization"]:
-             response_data["text"] = "I'm not sure I understood. Could you rephrase?"
+        if not response.text and response.visualization is None:
+             response.text = "I'm not sure I understood. Could you rephrase?"
 
-        return response_data
+        return response
 
-    def _handle_get_metric_json(self, company, year, metric):
-        value = self.get_metric_value(company, year, metric)
+    def render_json(self, parsed, value=MISSING):
+        """
+        Build the JSON structure for an already parsed query
+        """
+        return self.render_response(parsed, value).to_dict()
+
+    @timed('handle_get_metric_json')
+    def _handle_get_metric_json(self, company, year, metric, value=MISSING):
+        if value is MISSING:
+            value = self.get_metric_value(company, year, metric)
         if value is None:
-             return {"text": f"Sorry, I don't have {metric} data for {company} in {year}.", "visualization": None}
+             return ChatResponse(self.no_data_message(metric, company, year))
 
-        formatted_value = self.format_currency(value) if metric in ['revenue', 'net_income', 'cash_flow', 'assets'] else self.format_percentage(value)
-        
-        text = f"{company}'s {metric.replace('_', ' ').title()} in {year} was {formatted_value}."
+        info = metric_info(metric)
+        text = f"{company}'s {info.label} in {year} was {info.format(value)}."
         
         # Single bar for visualization might be too simple, but let's provide it
-        viz = {
-            "type": "bar",
-            "title": f"{company} {metric.replace('_', ' ').title()} ({year})",
-            "data": [
-                {"name": company, "value": value}
-            ]
-        }
-        
-        return {"text": text, "visualization": viz}
+        series = ChartSeries((company,), np.array([value], dtype=np.float64), isinstance(value, int))
+        return ChatResponse(text, Visualization("bar", f"{company} {info.label} ({year})", series))
 
-    def _handle_compare_json(self, metric, year):
-        if not metric:
-             return {"text": "Please specify a metric to compare.", "visualization": None}
+    @timed('handle_compare_json')
+    def _handle_compare_json(self, metric, year, plan=None):
+        if plan is None:
+            plan = QueryPlan((metric,) if metric else (), year)
+        if not plan.sort_metric:
+             return ChatResponse("Please specify a metric to compare.")
 
-        data = []
-        for company in ['Microsoft', 'Tesla', 'Apple']:
-            val = self.get_metric_value(company, year, metric)
-            if val is not None:
-                data.append({"name": company, "value": val})
-        
-        # Sort for better viz
-        data.sort(key=lambda x: x['value'], reverse=True)
-        
-        text = f"Comparing {metric.replace('_', ' ')} for {year}: " + ", ".join([f"{d['name']}: {d['value']}" for d in data])
+        # Filtered, sorted and limited on the store's columns
+        result = plan.execute(self.store)
+        if not len(result):
+            if plan.filters:
+                return ChatResponse(f"No companies match {self.format_filters(plan.filters)} in {plan.year}.")
+            return ChatResponse(self.no_data_message(plan.sort_metric, year=plan.year))
+
+        return self._compare_response(plan, self._compare_series(result))
+
+    def _compare_series(self, result):
+        """Chart series for plan rows: sort metric as "value", other metrics by name"""
+        store, metrics = self.store, result.plan.metrics
+        extra = tuple((other, result.values(other), store.is_integral(other)) for other in metrics[1:])
+        return ChartSeries(result.companies, result.values(metrics[0]), store.is_integral(metrics[0]), extra)
+
+    def _compare_response(self, plan, series, more=0):
+        info, year = metric_info(plan.sort_metric), plan.year
+        scope = f" ({self.format_filters(plan.filters)})" if plan.filters else ""
+        rows = ", ".join([f"{name}: {round(val, 1)}" for name, val in zip(series.names, series.value_list())])
+        text = f"Comparing {info.name} for {year}{scope}: " + rows
+        if more:
+            text += f", and {more} more"
         
-        viz = {
-            "type": "bar",
-            "title": f"{metric.replace('_', ' ').title()} Comparison ({year})",
-            "data": data,
-            "yLabel": metric.replace('_', ' ').title()
-        }
-        return {"text": text, "visualization": viz}
+        viz = Visualization("bar", f"{info.label} Comparison ({year})", series, info.label)
+        return ChatResponse(text, viz)
 
-    def _handle_trend_json(self, company, metric):
+    @timed('handle_trend_json')
+    def _handle_trend_json(self, company, metric, start_year=None, end_year=None):
         if not company or not metric:
-             return {"text": "For trends, I need both a company and a metric.", "visualization": None}
-
-        data = []
-        years = ['2022', '2023', '2024']
-        for y in years:
-            val = self.get_metric_value(company, y, metric)
-            if val is not None:
-                data.append({"name": y, "value": val})
+             return ChatResponse("For trends, I need both a company and a metric.")
+
+        years, values = self.store.series_values(company, metric, start_year, end_year)
+        if not years:
+            return ChatResponse(self.no_data_message(metric, company, start_year=start_year, end_year=end_year))
+        series = ChartSeries(years, values, self.store.is_integral(metric))
         
-        start_val = self.get_metric_value(company, '2022', metric)
-        end_val = self.get_metric_value(company, '2024', metric)
         change_text = ""
-        if start_val and end_val:
-            change_pct = ((end_val - start_val) / start_val) * 100
+        trend = self.store.trend(company, metric, start_year, end_year)
+        if trend:
+            first_year, _, change_pct = trend
             direction = "growth" if change_pct > 0 else "decline"
-            change_text = f" That's a {abs(change_pct):.1f}% {direction} since 2022."
+            change_text = f" That's a {abs(change_pct):.1f}% {direction} since {first_year}."
 
-        text = f"Here is the trend for {company}'s {metric.replace('_', ' ')}.{change_text}"
+        info = metric_info(metric)
+        text = f"Here is the trend for {company}'s {info.name}.{change_text}"
         
-        viz = {
-            "type": "line",
-            "title": f"{company} {metric.replace('_', ' ').title()} Trend",
-            "data": data,
-            "yLabel": metric.replace('_', ' ').title()
-        }
-        return {"text": text, "visualization": viz}
+        viz = Visualization("line", f"{company} {info.label} Trend", series, info.label)
+        return ChatResponse(text, viz)
@@ -0,0 +1,38 @@
+"""
+gunicorn settings for the chatbot API (see wsgi.py).
+
+All values can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('CHAT_BIND', '0.0.0.0:5000')
+
+# Threads help because requests release the GIL in spaCy/NumPy code and
+# while writing responses; processes scale the pure-Python parts
+workers = int(os.environ.get('CHAT_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('CHAT_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the model and data once in the master, then fork
+preload_app = True
+
+timeout = int(os.environ.get('CHAT_TIMEOUT', 30))
+keepalive = int(os.environ.get('CHAT_KEEPALIVE', 5))
+backlog = int(os.environ.get('CHAT_BACKLOG', 2048))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('CHAT_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('CHAT_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('CHAT_ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Threads don't survive the fork, so each worker polls the data file (and,
+    # with CHAT_FAST_START, loads spaCy) itself
+    from server import start_data_watcher, start_nlp_loader
+    start_nlp_loader()
+    start_data_watcher()
@@ -0,0 +1,25 @@
+"""
+Compact JSON encoding for API responses.
+
+Uses orjson when it is installed (several times faster than the standard
+library on chart-sized payloads) and falls back to json otherwise. Both
+paths sort keys and write UTF-8 without escapes, so they produce the same
+bytes for the payloads the chatbot builds (str, int, float, None, lists
+and dicts).
+
+    pip install orjson
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_json(obj):
+    """obj as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,193 @@
+import dataclasses
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from query_plan import QueryPlan
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """Cache key for a raw query: case-folded, whitespace collapsed, trailing punctuation dropped"""
+    return _WHITESPACE.sub(' ', query.casefold()).strip().rstrip('?!. ')
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping with least-recently-used eviction and hit/miss counters.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def evict(self, predicate):
+        """Drop every entry whose key satisfies predicate; returns how many went"""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# A rendered ChatResponse, its JSON bytes and the ETag it was rendered under
+EncodedResponse = namedtuple('EncodedResponse', ['payload', 'body', 'etag'])
+
+
+def response_dependencies(parsed):
+    """Companies whose data a rendered response reads, or None for every company"""
+    if parsed.is_screen and parsed.intent != 'trend':
+        return set(QueryPlan.from_parsed(parsed).companies) or None
+    return set(parsed.companies)
+
+
+class ResponseCache:
+    """
+    Two-level cache in front of ChatbotJSONAdapter.
+
+    Level 1 maps the normalized query to its ParsedQuery;
+    level 2 maps that parse to the rendered ChatResponse, so different
+    wordings of the same question share one rendered response. Each level-2
+    entry is encoded to JSON bytes once, when it is rendered, and carries an
+    ETag derived from the parse and the data version; the response itself is
+    kept column-wise, not as the point dicts that were encoded.
+    reload() applies data edits and drops only the responses that read a
+    changed company (comparisons over every company always go); a store
+    swapped in any other way clears both levels.
+    Cached payloads are shared between requests and must not be mutated.
+    """
+    def __init__(self, bot, parse_size=4096, response_size=1024):
+        self.bot = bot
+        self.parses = LRUCache(parse_size)
+        self.responses = LRUCache(response_size)
+        self._store = bot.store
+        # Bumped by every invalidation; a response rendered under an older
+        # generation may have read replaced data and is not cached
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    def _check_data_version(self):
+        # reload_data() swaps in a new store object
+        if self.bot.store is not self._store:
+            with self._lock:
+                if self.bot.store is not self._store:
+                    self.invalidate()
+
+    def invalidate(self, companies=None):
+        """Forget cached responses that read any of companies (everything when None)"""
+        with self._lock:
+            self._generation += 1
+            if companies is None:
+                self.parses.clear()
+                self.responses.clear()
+            else:
+                companies = set(companies)
+
+                def stale(parsed):
+                    reads = response_dependencies(parsed)
+                    return reads is None or not reads.isdisjoint(companies)
+                self.responses.evict(stale)
+            self._store = self.bot.store
+
+    def reload(self):
+        """Apply edits to the bot's data file; returns the changed companies (None = all)"""
+        with self._lock:
+            changed = self.bot.reload_data()
+            if changed is None:
+                self.invalidate()
+            elif changed:
+                self.invalidate(changed)
+            return changed
+
+    def parse_query(self, query):
+        """ParsedQuery for a raw query, from level 1 when possible"""
+        self._check_data_version()
+
+        key = normalize_query(query)
+        parsed = self.parses.get(key)
+        if parsed is None:
+            parsed = self.bot.parse_query(query)
+            self.parses.put(key, parsed)
+        return parsed
+
+    def etag(self, parsed, store=None):
+        """
+        Validator for the response to parsed, or None if the store has no version
+
+        Responses are a function of the parse and the data, so this needs no
+        rendering and a matching If-None-Match can be answered straight away.
+        """
+        version = (store or self.bot.store).version
+        if version is None:
+            return None
+        # Only the fields equal parses share (not confidence)
+        key = tuple(getattr(parsed, field.name) for field in dataclasses.fields(parsed) if field.compare)
+        return hashlib.blake2b(f'{version}\0{key!r}'.encode(), digest_size=10).hexdigest()
+
+    def encoded(self, parsed):
+        """EncodedResponse for an already parsed query, from level 2 when possible"""
+        self._check_data_version()
+
+        entry = self.responses.get(parsed)
+        if entry is None:
+            # Tag with the store read before rendering: if a reload slips in,
+            # the client holds new data under the old tag and refetches
+            generation, store = self._generation, self.bot.store
+            payload = self.bot.render_response(parsed)
+            entry = EncodedResponse(payload, payload.encode(), self.etag(parsed, store))
+            with self._lock:
+                if generation == self._generation:
+                    self.responses.put(parsed, entry)
+        return entry
+
+    def process_query_encoded(self, query):
+        # Canned answers skip parsing and both levels; they carry no ETag
+        answer = self.bot.canned_response(query)
+        if answer is not None:
+            return EncodedResponse(answer, answer.encode(), None)
+        return self.encoded(self.parse_query(query))
+
+    def process_query_json(self, query):
+        return self.process_query_encoded(query).payload.to_dict()
+
+    def stats(self):
+        return {"parse": self.parses.stats(), "response": self.responses.stats()}
@@ -1,11 +1,198 @@
-from flask import Flask, request, jsonify
+import argparse
+import hmac
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from chatbot_adapter import ChatbotJSONAdapter
+from json_encoding import encode_json
+from instrumentation import (mark_startup, render_histogram, render_prometheus, render_startup,
+                             slow_request_profiler, stage_timer, startup_phase)
+from nlp_pipeline import get_nlp, load_in_background
+from Task2_Financial_Chatbot.canned_answers import DEFAULT_CANNED_PATH
+from response_cache import ResponseCache
+from worker_pool import PoolReloadError, WorkerError, WorkerPool, WorkerUnavailable
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend
+CORS(app, expose_headers=['ETag'])  # Enable CORS for frontend
+
+# Batch endpoint tuning (spaCy nlp.pipe batch size / worker processes)
+BATCH_SIZE = int(os.environ.get('CHAT_BATCH_SIZE', 64))
+BATCH_N_PROCESS = int(os.environ.get('CHAT_BATCH_N_PROCESS', 1))
+MAX_BATCH_QUERIES = int(os.environ.get('CHAT_MAX_BATCH_QUERIES', 1000))
+
+# Concurrent /chat queries that need NER share one nlp.pipe call: a batch
+# closes CHAT_NER_BATCH_WINDOW_MS after its first query or at CHAT_NER_MAX_BATCH
+NER_BATCHING = os.environ.get('CHAT_NER_BATCHING', '1') != '0'
+NER_BATCH_WINDOW_MS = float(os.environ.get('CHAT_NER_BATCH_WINDOW_MS', 3.0))
+NER_MAX_BATCH = int(os.environ.get('CHAT_NER_MAX_BATCH', 32))
+
+# Chart points per streamed data event
+STREAM_CHUNK_SIZE = int(os.environ.get('CHAT_STREAM_CHUNK_SIZE', 200))
+
+# Response cache sizes (parsed queries / rendered payloads)
+PARSE_CACHE_SIZE = int(os.environ.get('CHAT_PARSE_CACHE_SIZE', 4096))
+RESPONSE_CACHE_SIZE = int(os.environ.get('CHAT_RESPONSE_CACHE_SIZE', 1024))
+
+# Process-pool mode (python server.py --workers N): /chat and /chat/batch
+# run in N warm worker processes instead of this one
+POOL_WORKERS = int(os.environ.get('CHAT_POOL_WORKERS', 0))
+POOL_TIMEOUT = float(os.environ.get('CHAT_POOL_TIMEOUT', 30))
+POOL_HEALTH_INTERVAL = float(os.environ.get('CHAT_POOL_HEALTH_INTERVAL', 5))
+
+# POST /admin/reload needs this token in X-Admin-Token (disabled when unset).
+# Under gunicorn it reloads only the worker that handles the request; every
+# worker polls the data file itself when CHAT_DATA_WATCH_SECONDS > 0
+ADMIN_TOKEN = os.environ.get('CHAT_ADMIN_TOKEN', '')
+DATA_WATCH_SECONDS = float(os.environ.get('CHAT_DATA_WATCH_SECONDS', 0))
+
+# Canned Q&A file (JSON lines) answered before any parsing; defaults to
+# Task2_Financial_Chatbot/canned_answers.jsonl, CHAT_CANNED_ANSWERS=0 turns it off
+CANNED_ANSWERS = os.environ.get('CHAT_CANNED_ANSWERS', DEFAULT_CANNED_PATH)
+if CANNED_ANSWERS == '0':
+    CANNED_ANSWERS = None
+
+# Paraphrases and company aliases the keyword vocabularies miss are matched
+# against the semantic index (semantic_index.py); CHAT_SEMANTIC_FALLBACK=0 turns it off
+SEMANTIC_FALLBACK = os.environ.get('CHAT_SEMANTIC_FALLBACK', '1') != '0'
+
+# CHAT_FAST_START=1: report ready once the data and the rule-based path are
+# warm, and load spaCy on a background thread after any fork (queries that
+# need NER wait for it). Pair with CHAT_NLP_SNAPSHOT for a faster model load.
+FAST_START = os.environ.get('CHAT_FAST_START', '0') != '0'
+
+# Responses from these count towards the first_response startup milestone
+CHAT_ENDPOINTS = {'chat', 'chat_stream', 'chat_batch'}
+
+# Pool workers started with "spawn" re-import this module as __mp_main__;
+# they build their own bot (worker_pool._worker_main), so skip this one there
+if __name__ != '__mp_main__':
+    with startup_phase('store'):
+        bot = ChatbotJSONAdapter()
+    canned = bot.enable_canned_answers(CANNED_ANSWERS) if CANNED_ANSWERS else None
+    if SEMANTIC_FALLBACK:
+        with startup_phase('semantic_index'):
+            bot.enable_semantic_fallback()
+    cache = ResponseCache(bot, parse_size=PARSE_CACHE_SIZE, response_size=RESPONSE_CACHE_SIZE)
+    ner_batcher = bot.enable_ner_batching(NER_BATCH_WINDOW_MS, NER_MAX_BATCH) if NER_BATCHING else None
+
+# Opt-in folded-stack dumps for slow /chat requests (CHAT_PROFILE_SLOW_MS)
+profiler = slow_request_profiler()
+
+# WorkerPool in process-pool mode, else None
+pool = None
+
+# Set once the NLP model has been loaded and exercised
+ready = threading.Event()
+
+def warm_up():
+    """Load the spaCy model (unless CHAT_FAST_START) and run one query end to end before serving traffic"""
+    with startup_phase('warm_up'):
+        if not FAST_START:
+            get_nlp()("What was Apple Inc's revenue in 2024?")
+        bot.process_query_json("What was Microsoft's revenue in 2024?")
+        if pool is not None:
+            pool.start()
+    ready.set()
+    mark_startup('ready')
+
+def start_nlp_loader():
+    """With CHAT_FAST_START, load the spaCy model on a background thread in this process"""
+    if FAST_START:
+        load_in_background()
+
+def start_data_watcher():
+    """Poll the data file every CHAT_DATA_WATCH_SECONDS in this process, if enabled"""
+    if DATA_WATCH_SECONDS > 0:
+        threading.Thread(target=watch_data, args=(bot.data_path, DATA_WATCH_SECONDS),
+                         name='data-watcher', daemon=True).start()
+
+def reload_data():
+    """Apply edits to the data file here and in every worker; returns the changed companies"""
+    changed = cache.reload()
+    if pool is not None:
+        pool.reload()
+    return changed
+
+def watch_data(path, interval):
+    """
+    Reload whenever the data file's size or modification time changes
+
+    The first check reloads unconditionally (a no-op when the content hash
+    matches): a gunicorn worker forked, or recycled, after the file changed
+    inherits the master's store and must not take that file as already seen.
+    """
+    def signature():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    last = None
+    while True:
+        current = signature()
+        if current is not None and current != last:
+            try:
+                changed = reload_data()
+            except Exception as exc:
+                print(f"⚠️  Data reload failed: {exc}")
+            else:
+                last = current
+                if changed is None or changed:
+                    print(f"🔄 Reloaded {path}: "
+                          f"{'all companies' if changed is None else f'{len(changed)} companies'} changed")
+        time.sleep(interval)
 
-bot = ChatbotJSONAdapter()
+def json_response(body, etag=None):
+    """Send pre-encoded JSON, tagged with etag when there is one"""
+    response = Response(body, mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+def not_modified(etag):
+    """304 response if the client already holds the response tagged etag, else None"""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+def pool_response(call, wrap=b'%s'):
+    """
+    Send a worker's (pre-encoded JSON, ETag), a 304 if the client already
+    holds it, or an error if the pool could not answer
+    """
+    try:
+        body, etag = call()
+    except WorkerUnavailable as exc:
+        return jsonify({"error": str(exc)}), 503
+    except WorkerError as exc:
+        return jsonify({"error": str(exc)}), 500
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+    return json_response(wrap % body, etag)
+
+@app.after_request
+def record_first_response(response):
+    if request.endpoint in CHAT_ENDPOINTS and response.status_code < 400:
+        mark_startup('first_response')
+    return response
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok"})
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    if not ready.is_set():
+        return jsonify({"status": "warming_up"}), 503
+    return jsonify({"status": "ready"})
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -14,9 +201,157 @@ def chat():
     if not query:
         return jsonify({"error": "No query provided"}), 400
     
-    response = bot.process_query_json(query)
-    return jsonify(response)
+    with profiler.profile('chat') if profiler else nullcontext(), stage_timer('chat_request'):
+        # Canned answers are a dict lookup away, in pool mode too
+        answer = bot.canned_json(query)
+        if answer is not None:
+            return json_response(encode_json(answer))
+        # Parsing (and so NER) stays in the workers; a worker answers
+        # revalidations from its own cache and the 304 is decided here
+        if pool is not None:
+            return pool_response(lambda: pool.chat(query))
+        # A client revalidating its copy gets a 304 before anything is rendered
+        parsed = cache.parse_query(query)
+        unchanged = not_modified(cache.etag(parsed))
+        if unchanged is not None:
+            return unchanged
+        entry = cache.encoded(parsed)
+    return json_response(entry.body, entry.etag)
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same answer as /chat as newline-delimited JSON events: the parsed query,
+    then the text summary, then chart points in chunks (see stream_json)
+    """
+    data = request.json or {}
+    query = data.get('query', '')
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+
+    answer = bot.canned_json(query)
+    if answer is not None:
+        events = [{"type": "text", **answer}, {"type": "done", "points": 0}]
+        return Response(b"".join(encode_json(event) + b"\n" for event in events),
+                        mimetype='application/x-ndjson')
+
+    parsed = cache.parse_query(query)
+    etag = cache.etag(parsed)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+
+    def generate():
+        for event in bot.stream_json(parsed, chunk_size=STREAM_CHUNK_SIZE):
+            yield encode_json(event) + b"\n"
+
+    # X-Accel-Buffering stops nginx from holding the stream back
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    lines = [render_prometheus(), render_startup().rstrip("\n")]
+    for level, stats in cache.stats().items():
+        lines.append(f'chatbot_cache_hits_total{{level="{level}"}} {stats["hits"]}')
+        lines.append(f'chatbot_cache_misses_total{{level="{level}"}} {stats["misses"]}')
+        lines.append(f'chatbot_cache_entries{{level="{level}"}} {stats["size"]}')
+    if ner_batcher is not None:
+        stats = ner_batcher.stats()
+        lines.append(f'chatbot_ner_queue_depth {stats["queue_depth"]}')
+        lines.append(f'chatbot_ner_batches_total {stats["batches"]}')
+        lines.append(f'chatbot_ner_batched_queries_total {stats["items"]}')
+        lines.append(render_histogram('chatbot_ner_batch_size', ner_batcher.batch_sizes,
+                                      "Queries per NER batch.").rstrip("\n"))
+        lines.append(render_histogram('chatbot_ner_queue_wait_seconds', ner_batcher.queue_wait,
+                                      "Time a query waited for its NER batch to start.").rstrip("\n"))
+    if canned is not None:
+        stats = canned.stats()
+        lines.append(f'chatbot_canned_entries {stats["size"]}')
+        lines.append(f'chatbot_canned_hits_total {stats["hits"]}')
+        lines.append(f'chatbot_canned_misses_total {stats["misses"]}')
+    if pool is not None:
+        stats = pool.stats()
+        lines.append(f'chatbot_pool_workers {stats["workers"]}')
+        lines.append(f'chatbot_pool_workers_alive {stats["alive"]}')
+        lines.append(f'chatbot_pool_workers_idle {stats["idle"]}')
+        lines.append(f'chatbot_pool_requests_total {stats["requests"]}')
+        lines.append(f'chatbot_pool_failures_total {stats["failures"]}')
+        lines.append(f'chatbot_pool_restarts_total {stats["restarts"]}')
+    lines.append(f'chatbot_ready {int(ready.is_set())}')
+    return Response("\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Apply edits to the data file; only the changed companies' cache entries are dropped
+
+    Under gunicorn this reaches only the worker serving the request; use
+    CHAT_DATA_WATCH_SECONDS there.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Reload is disabled; set CHAT_ADMIN_TOKEN to enable it"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 403
+
+    try:
+        changed = reload_data()
+    except PoolReloadError as exc:
+        # This process reloaded; the listed workers did not (or were restarted)
+        return jsonify({"error": str(exc), "failed_workers": {str(slot): error for slot, error in exc.failed.items()},
+                        "cache": cache.stats()}), 503
+    except (WorkerUnavailable, WorkerError) as exc:
+        return jsonify({"error": str(exc)}), 503
+    return jsonify({
+        "changed": None if changed is None else sorted(changed),
+        "full": changed is None,
+        "cache": cache.stats(),
+    })
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats())
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    data = request.json or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "No queries provided"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+    if not all(isinstance(q, str) and q for q in queries):
+        return jsonify({"error": "Every query must be a non-empty string"}), 400
+    
+    if pool is not None:
+        return pool_response(lambda: (pool.batch(queries, batch_size=BATCH_SIZE, n_process=BATCH_N_PROCESS), None),
+                             wrap=b'{"responses":%s}')
+    responses = bot.process_queries_json(queries, batch_size=BATCH_SIZE, n_process=BATCH_N_PROCESS)
+    return json_response(encode_json({"responses": responses}))
+
+mark_startup('imported')
 
 if __name__ == '__main__':
-    print("Starting Flask API server on port 5000...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server; see wsgi.py / gunicorn.conf.py for production
+    parser = argparse.ArgumentParser(description="GFC chatbot API server")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS,
+                        help="run /chat and /chat/batch in this many worker processes (0 = in-process)")
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        pool = WorkerPool(args.workers, data_path=bot.data_path, parse_cache_size=PARSE_CACHE_SIZE,
+                          response_cache_size=RESPONSE_CACHE_SIZE, request_timeout=POOL_TIMEOUT,
+                          health_interval=POOL_HEALTH_INTERVAL, canned_path=CANNED_ANSWERS,
+                          semantic_fallback=SEMANTIC_FALLBACK)
+        print(f"Starting Flask API server on port {args.port} with {args.workers} worker processes...")
+    else:
+        print(f"Starting Flask API server on port {args.port}...")
+    threading.Thread(target=warm_up, daemon=True).start()
+    start_nlp_loader()
+    start_data_watcher()
+    # The reloader would start a second copy of the pool
+    app.run(host='0.0.0.0', port=args.port, debug=True, use_reloader=pool is None, threaded=True)
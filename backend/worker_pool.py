@@ -0,0 +1,334 @@
+"""
+Process-pool backend for the chatbot API.
+
+Each worker process builds and warms its own ChatbotJSONAdapter (with its
+own response cache), so spaCy and fuzzy matching run on as many cores as
+there are workers instead of behind one GIL. Requests go to an idle
+worker over a pipe; the worker answers with the response already encoded
+as compact JSON bytes (and, for /chat, its ETag), which the server sends
+as is.
+
+Workers are pinged while idle and replaced if they die, hang or fail a
+health check. reload() has every worker apply edits to the data file.
+
+    python backend/server.py --workers 8
+"""
+
+import math
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Smallest /chat/batch slice worth sending to a separate worker
+MIN_BATCH_SLICE = 16
+
+
+class WorkerError(RuntimeError):
+    """A worker raised while handling a request"""
+
+
+class WorkerUnavailable(RuntimeError):
+    """No worker answered in time, or the worker died mid-request"""
+
+
+class WorkerCrashed(WorkerUnavailable):
+    """The worker process exited while handling a request"""
+
+
+class PoolReloadError(WorkerUnavailable):
+    """
+    Some workers could not reload; failed maps their slots to the error,
+    changed is what the others reported
+    """
+
+    def __init__(self, failed, changed):
+        self.failed = failed
+        self.changed = changed
+        super().__init__("reload failed on worker(s) " + ", ".join(
+            f"{slot} ({error})" for slot, error in sorted(failed.items())))
+
+
+def _worker_main(conn, data_path, parse_cache_size, response_cache_size, canned_path, semantic_fallback):
+    # Imported in the worker: each process builds its own model, data and caches
+    from chatbot_adapter import ChatbotJSONAdapter
+    from json_encoding import encode_json
+    from nlp_pipeline import get_nlp
+    from response_cache import ResponseCache
+
+    bot = ChatbotJSONAdapter(data_path)
+    if canned_path:
+        bot.enable_canned_answers(canned_path)
+    if semantic_fallback:
+        bot.enable_semantic_fallback()
+    cache = ResponseCache(bot, parse_size=parse_cache_size, response_size=response_cache_size)
+    get_nlp()("What was Apple Inc's revenue in 2024?")
+    bot.process_query_json("What was Microsoft's revenue in 2024?")
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            if op == 'chat':
+                entry = cache.process_query_encoded(payload)
+                result = entry.body, entry.etag
+            elif op == 'batch':
+                queries, batch_size, n_process = payload
+                result = encode_json(bot.process_queries_json(queries, batch_size=batch_size, n_process=n_process))
+            elif op == 'reload':
+                changed = cache.reload()
+                result = None if changed is None else sorted(changed)
+            elif op == 'ping':
+                result = None
+            elif op == 'stop':
+                return
+            else:
+                raise ValueError(f"unknown operation {op!r}")
+        except Exception as exc:
+            conn.send(('error', f"{type(exc).__name__}: {exc}"))
+        else:
+            conn.send(('ok', result))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe"""
+
+    def __init__(self, ctx, slot, args):
+        self.slot = slot
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, *args),
+                                   name=f'chat-worker-{slot}', daemon=True)
+        self.process.start()
+        child.close()
+
+    def wait_ready(self, timeout):
+        if not self.conn.poll(timeout):
+            raise WorkerUnavailable(f"worker {self.slot} did not start within {timeout:.0f}s")
+        try:
+            self.conn.recv()
+        except (EOFError, OSError):
+            raise WorkerUnavailable(f"worker {self.slot} exited during start-up "
+                                    f"(exit code {self.process.exitcode})") from None
+
+    def call(self, op, payload, timeout):
+        try:
+            self.conn.send((op, payload))
+            if not self.conn.poll(timeout):
+                raise WorkerUnavailable(f"worker {self.slot} did not answer within {timeout:.0f}s")
+            status, result = self.conn.recv()
+        except (EOFError, OSError) as exc:
+            raise WorkerCrashed(f"worker {self.slot} died: {exc!r}") from None
+        if status == 'error':
+            raise WorkerError(result)
+        return result
+
+    def stop(self, timeout=1.0):
+        try:
+            self.conn.send(('stop', None))
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Fixed set of chatbot worker processes with health checks and restarts
+
+    Each request holds one idle worker for its duration, so at most
+    `workers` requests run at once; the rest wait up to request_timeout.
+    Workers are started with the "spawn" method, which is safe to use
+    from a threaded server and works the same on Windows.
+    """
+
+    def __init__(self, workers, data_path=None, parse_cache_size=4096, response_cache_size=1024,
+                 request_timeout=30.0, start_timeout=300.0, health_interval=5.0, canned_path=None,
+                 semantic_fallback=False):
+        self.size = workers
+        self.request_timeout = request_timeout
+        self.start_timeout = start_timeout
+        self.health_interval = health_interval
+        self.restarts = 0
+        self.requests = 0
+        self.failures = 0
+        self._args = (data_path, parse_cache_size, response_cache_size, canned_path, semantic_fallback)
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-pool')
+
+    def start(self):
+        """Start every worker and wait until all are warm"""
+        self._workers = [_Worker(self._ctx, slot, self._args) for slot in range(self.size)]
+        for worker in self._workers:
+            worker.wait_ready(self.start_timeout)
+            self._idle.put(worker)
+        threading.Thread(target=self._monitor, name='chat-pool-monitor', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False)
+        for worker in self._workers:
+            worker.stop()
+
+    def _replace(self, worker):
+        """
+        Kill a failed worker and start new ones in its slot until one is warm;
+        returns it, or None once the pool is stopped
+        """
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+        while not self._stopped.is_set():
+            replacement = _Worker(self._ctx, worker.slot, self._args)
+            with self._lock:
+                self._workers[worker.slot] = replacement
+                self.restarts += 1
+            try:
+                replacement.wait_ready(self.start_timeout)
+            except WorkerUnavailable as exc:
+                # Never handed out; tried again on the health-check schedule
+                replacement.stop()
+                if not self._stopped.is_set():
+                    print(f"⚠️  Chat worker restart failed: {exc}")
+                    self._stopped.wait(self.health_interval)
+                continue
+            if self._stopped.is_set():
+                replacement.stop()
+                break
+            return replacement
+        return None
+
+    def _restart(self, worker):
+        # Warming a replacement takes seconds, so it happens off the request
+        # thread; the slot rejoins the idle queue only once a new worker is up
+        def restart():
+            replacement = self._replace(worker)
+            if replacement is not None:
+                self._idle.put(replacement)
+
+        threading.Thread(target=restart, name=f'chat-pool-restart-{worker.slot}', daemon=True).start()
+
+    def _call(self, op, payload, retry=True):
+        try:
+            worker = self._idle.get(timeout=self.request_timeout)
+        except queue.Empty:
+            raise WorkerUnavailable(f"no idle worker within {self.request_timeout:.0f}s") from None
+
+        with self._lock:
+            self.requests += 1
+        try:
+            result = worker.call(op, payload, self.request_timeout)
+        except WorkerUnavailable as exc:
+            with self._lock:
+                self.failures += 1
+            self._restart(worker)
+            # Requests are read-only, so one that lost its worker is retried
+            # on another; one that timed out is not (it may hang again)
+            if retry and isinstance(exc, WorkerCrashed):
+                return self._call(op, payload, retry=False)
+            raise
+        except WorkerError:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+        return result
+
+    def chat(self, query):
+        """(process_query_json(query) as JSON bytes, its ETag)"""
+        return self._call('chat', query)
+
+    def batch(self, queries, batch_size=64, n_process=1):
+        """process_queries_json(queries) as JSON bytes, split across idle workers"""
+        n_slices = max(1, min(self.size, len(queries) // MIN_BATCH_SLICE))
+        step = math.ceil(len(queries) / n_slices)
+        slices = [queries[i:i + step] for i in range(0, len(queries), step)]
+        parts = list(self._executor.map(lambda part: self._call('batch', (part, batch_size, n_process)), slices))
+
+        # Each part is a JSON array; splice their items into one array
+        items = [part[1:-1] for part in parts if len(part) > 2]
+        return b'[' + b','.join(items) + b']'
+
+    def reload(self):
+        """
+        Have every worker apply edits to its data file; returns the changed
+        companies (None = everything)
+
+        Workers are taken as they become idle and held until all of them
+        have been tried, so none is reloaded twice and requests keep running
+        on the rest in the meantime. A failure on one worker does not stop
+        the others; PoolReloadError then names every worker that failed.
+        """
+        changed, held, failed = set(), [], {}
+        try:
+            for _ in range(self.size):
+                try:
+                    worker = self._idle.get(timeout=self.request_timeout)
+                except queue.Empty:
+                    continue
+                try:
+                    result = worker.call('reload', None, self.request_timeout)
+                except WorkerUnavailable as exc:
+                    # Its replacement reads the current file when it starts
+                    failed[worker.slot] = str(exc)
+                    self._restart(worker)
+                    continue
+                except WorkerError as exc:
+                    failed[worker.slot] = str(exc)
+                    held.append(worker)
+                    continue
+                held.append(worker)
+                # A restarted worker's replacement may come round again and succeed
+                failed.pop(worker.slot, None)
+                changed = None if changed is None or result is None else changed | set(result)
+        finally:
+            for worker in held:
+                self._idle.put(worker)
+
+        tried = {worker.slot for worker in held} | set(failed)
+        for slot in range(self.size):
+            if slot not in tried:
+                failed[slot] = f"not idle within {self.request_timeout:.0f}s"
+        if failed:
+            raise PoolReloadError(failed, changed)
+        return changed
+
+    def _monitor(self):
+        while not self._stopped.wait(self.health_interval):
+            # Ping only idle workers; busy ones are checked by their own request
+            checked = []
+            for _ in range(self.size):
+                try:
+                    checked.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            for worker in checked:
+                try:
+                    worker.call('ping', None, self.request_timeout)
+                except WorkerUnavailable:
+                    self._restart(worker)
+                else:
+                    self._idle.put(worker)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.size,
+                "alive": sum(worker.process.is_alive() for worker in self._workers),
+                "idle": self._idle.qsize(),
+                "requests": self.requests,
+                "failures": self.failures,
+                "restarts": self.restarts,
+            }
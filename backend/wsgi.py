@@ -0,0 +1,29 @@
+"""
+Production entry point for the chatbot API.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+gunicorn.conf.py sets preload_app, so this module is imported once in the
+master: the spaCy model, the memory-mapped financial data and the chatbot
+are built and warmed before the workers fork and share those pages
+copy-on-write. /ready reports healthy in every worker from the start.
+
+With CHAT_FAST_START=1 the master skips the spaCy model. Each worker then
+loads it on a background thread after the fork and serves queries that
+need no NER in the meantime. This suits single-worker instances that
+start often. Multi-worker hosts are better off sharing one preloaded
+model.
+"""
+
+import gc
+
+from server import app, warm_up
+
+warm_up()
+
+# Move everything built so far out of the collector's reach so the workers'
+# GC passes don't touch (and un-share) the preloaded pages
+gc.freeze()
+
+application = app
@@ -0,0 +1,188 @@
+"""
+Allocation benchmark for JSON responses over a large company universe.
+
+Builds a synthetic 10-K panel (the real companies plus --companies
+generated ones, same fiscal years) in a temporary directory, loads it as
+the chatbot's store and measures each query under tracemalloc:
+
+    peak      peak bytes while a parsed query is rendered and encoded to
+              JSON (render_response(...).encode())
+    payload   bytes held by the rendered ChatResponse
+    dicts     bytes held by the same response as point dicts (render_json),
+              what a cache of dict payloads would keep per entry
+    cached    bytes a ResponseCache keeps for the response once it is cached
+              (the ChatResponse plus its encoded body)
+    body      size of the encoded JSON
+
+    python benchmarks/bench_allocations.py --companies 5000
+    python benchmarks/bench_allocations.py --save-baseline benchmarks/alloc_baseline.json
+    python benchmarks/bench_allocations.py --baseline benchmarks/alloc_baseline.json --threshold 0.25
+
+With --baseline, the exit status is 1 when any query's peak or cached
+bytes rise by more than --threshold (a fraction).
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+DEFAULT_QUERIES = [
+    "compare revenue in 2024",
+    "compare revenue and net income in 2024",
+    "top 100 companies by ROE in 2023 with margin above 20%",
+    "companies with revenue over $100bn",
+    "Show Apple's revenue trend",
+    "What was Microsoft's revenue in 2024?",
+]
+
+# Raw columns generated for synthetic companies, with the scale of their figures (millions)
+RAW_SCALES = {
+    'Total_Revenue': 50_000,
+    'Net_Income': 5_000,
+    'Total_Assets': 80_000,
+    'Total_Liabilities': 40_000,
+    'Operating_Cash_Flow': 8_000,
+}
+
+# Measurements compared against a baseline
+TRACKED = ('peak', 'cached')
+
+
+def synthetic_panel(source, dest, companies, seed=0):
+    """Write source's rows plus companies generated ones (same years) to dest"""
+    import pandas as pd
+
+    real = pd.read_csv(source, dtype={'Fiscal_Year': str})
+    years = sorted(real['Fiscal_Year'].unique())
+    rng = np.random.default_rng(seed)
+    rows = len(years) * companies
+    generated = pd.DataFrame({
+        'Company': np.repeat([f"Company {i:05d}" for i in range(companies)], len(years)),
+        'Fiscal_Year': np.tile(years, companies),
+    })
+    for column, scale in RAW_SCALES.items():
+        generated[column] = np.round(rng.lognormal(0, 1, rows) * scale).astype(np.int64)
+    pd.concat([real, generated], ignore_index=True).to_csv(dest, index=False)
+
+
+def traced(fn):
+    """(result, peak bytes, bytes still allocated) of fn(), counting only its own allocations"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, current
+
+
+def measure(bot, parsed):
+    from response_cache import ResponseCache
+
+    def fresh_cache():
+        cache = ResponseCache(bot)
+        cache.encoded(parsed)
+        return cache
+
+    # Untimed first pass, so lazily built store state is not counted
+    body = bot.render_response(parsed).encode()
+    bot.render_json(parsed)
+    fresh_cache()
+
+    _, peak, _ = traced(lambda: bot.render_response(parsed).encode())
+    _, _, payload = traced(lambda: bot.render_response(parsed))
+    _, _, dicts = traced(lambda: bot.render_json(parsed))
+    _, _, empty = traced(lambda: ResponseCache(bot))
+    _, _, cached = traced(fresh_cache)
+    return {
+        'points': len((json.loads(body)['visualization'] or {}).get('data', [])),
+        'body': len(body),
+        'peak': peak,
+        'payload': payload,
+        'dicts': dicts,
+        'cached': cached - empty,
+    }
+
+
+def run(queries, companies, workdir):
+    from chatbot_adapter import ChatbotJSONAdapter
+    from financial_store import DEFAULT_DATA_PATH, load_store
+
+    panel = os.path.join(workdir, 'panel.csv')
+    synthetic_panel(os.path.join(os.path.dirname(DEFAULT_DATA_PATH), 'financial_data.csv'), panel, companies)
+
+    bot = ChatbotJSONAdapter()
+    # Snapshot in the temporary directory rather than next to the real data
+    bot.store = load_store(panel, cache_dir=os.path.join(workdir, 'cache'))
+
+    results = {'companies': len(bot.store.companies), 'queries': {}}
+    for query in queries:
+        results['queries'][query] = measure(bot, bot.parse_query(query))
+    return results
+
+
+def check_regressions(results, baseline, threshold):
+    """Human-readable list of regressions beyond threshold"""
+    failures = []
+    for query, current in results['queries'].items():
+        before = baseline.get('queries', {}).get(query)
+        if not before:
+            continue
+        for key in TRACKED:
+            if before.get(key) and current[key] > before[key] * (1 + threshold):
+                failures.append(f"{query!r}: {key} {current[key]:,} B vs baseline {before[key]:,} B")
+    return failures
+
+
+def print_report(results):
+    print(f"{results['companies']:,} companies")
+    columns = ('body', 'peak', 'payload', 'dicts', 'cached')
+    print(f"\n  {'query':<56}{'points':>8}" + "".join(f"{column:>10}" for column in columns) + "  (KiB)")
+    for query, r in results['queries'].items():
+        print(f"  {query[:55]:<56}{r['points']:>8}" + "".join(f"{r[column] / 1024:>10.1f}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure allocations per GFC chatbot JSON response")
+    parser.add_argument('--companies', type=int, default=5000, help="synthetic companies added to the panel")
+    parser.add_argument('--query', action='append', help="query to measure (repeatable; default: a built-in set)")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed regression as a fraction (default 0.25 = 25%%)")
+    parser.add_argument('--save-baseline', help="write the results as a new baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(args.query or DEFAULT_QUERIES, args.companies, workdir)
+    print_report(results)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = check_regressions(results, json.load(f), args.threshold)
+        if failures:
+            print(f"\n❌ Regression beyond {args.threshold:.0%}:")
+            for failure in failures:
+                print(f"  - {failure}")
+            sys.exit(1)
+        print(f"\n✅ No regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
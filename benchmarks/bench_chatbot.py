@@ -0,0 +1,222 @@
+"""
+Latency and throughput benchmark for the chatbot pipeline.
+
+Replays a query corpus (benchmarks/queries.txt by default) against:
+
+    process_query       NLPFinancialChatbot text responses
+    process_query_json  ChatbotJSONAdapter JSON responses
+    http_chat           POST /chat through Flask's test client
+
+and reports per-stage timings (vocabulary matching, year parsing, company
+fallback, full parse, render), p50/p95/p99 latency, queries per second and
+peak RSS.
+
+    python benchmarks/bench_chatbot.py --rounds 20
+    python benchmarks/bench_chatbot.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_chatbot.py --baseline benchmarks/baseline.json --threshold 0.25
+
+With --baseline, the exit status is 1 when any target's p95 latency rises,
+or its throughput falls, by more than --threshold (a fraction).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'queries.txt')
+
+# vocabulary: company/metric/intent matching; company_fallback: NER + fuzzy
+# search (only when no alias matched); parse: the whole single-pass parse
+STAGES = ['vocabulary', 'year', 'company_fallback', 'parse', 'render']
+
+
+def load_queries(path):
+    """Non-blank, non-comment lines of a corpus file"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples_ns, elapsed_ns=None):
+    """Latency summary in milliseconds (plus QPS when the wall time is known)"""
+    ordered = sorted(samples_ns)
+    summary = {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) / 1e6 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 50) / 1e6,
+        'p95_ms': percentile(ordered, 95) / 1e6,
+        'p99_ms': percentile(ordered, 99) / 1e6,
+    }
+    if elapsed_ns:
+        summary['qps'] = len(ordered) / (elapsed_ns / 1e9)
+    return summary
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def bench_stages(bot, queries, rounds):
+    """Time each parsing stage and the text render separately"""
+    samples = {stage: [] for stage in STAGES}
+    clock = time.perf_counter_ns
+    for _ in range(rounds):
+        for query in queries:
+            t0 = clock()
+            matches = bot.matcher.find_all(query)
+            t1 = clock()
+            bot.parser.years(query)
+            t2 = clock()
+            if not matches['company']:
+                bot.resolve_company_fallback(query)
+            t3 = clock()
+            parsed = bot.parser.parse(query)
+            t4 = clock()
+            bot.render(parsed)
+            t5 = clock()
+            for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+                samples[stage].append(end - start)
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+def bench_target(fn, queries, rounds):
+    """End-to-end latency and throughput of fn(query)"""
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for _ in range(rounds):
+        for query in queries:
+            t0 = clock()
+            fn(query)
+            samples.append(clock() - t0)
+    return summarize(samples, clock() - started)
+
+
+def run(queries, rounds):
+    from chatbot_adapter import ChatbotJSONAdapter
+    from nlp_chatbot import NLPFinancialChatbot
+
+    import server
+    client = server.app.test_client()
+    server.warm_up()
+
+    # Configured like the server's bot (CHAT_CANNED_ANSWERS, CHAT_SEMANTIC_FALLBACK)
+    # so all three targets answer the same way
+    text_bot = NLPFinancialChatbot()
+    json_bot = ChatbotJSONAdapter()
+    for bot in (text_bot, json_bot):
+        if server.CANNED_ANSWERS:
+            bot.enable_canned_answers(server.CANNED_ANSWERS)
+        if server.SEMANTIC_FALLBACK:
+            bot.enable_semantic_fallback()
+
+    def http_chat(query):
+        response = client.post('/chat', json={'query': query})
+        if response.status_code != 200:
+            raise RuntimeError(f"/chat returned {response.status_code} for {query!r}")
+
+    targets = {
+        'process_query': text_bot.process_query,
+        'process_query_json': json_bot.process_query_json,
+        'http_chat': http_chat,
+    }
+
+    # One untimed pass so model loading and first-call costs are excluded
+    for fn in targets.values():
+        for query in queries:
+            fn(query)
+
+    results = {'queries': len(queries), 'rounds': rounds}
+    results['stages'] = bench_stages(text_bot, queries, rounds)
+    results['targets'] = {name: bench_target(fn, queries, rounds) for name, fn in targets.items()}
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def check_regressions(results, baseline, threshold):
+    """Human-readable list of regressions beyond threshold"""
+    failures = []
+    for name, current in results['targets'].items():
+        before = baseline.get('targets', {}).get(name)
+        if not before:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            failures.append(f"{name}: p95 {current['p95_ms']:.3f} ms vs baseline {before['p95_ms']:.3f} ms")
+        if current['qps'] < before['qps'] * (1 - threshold):
+            failures.append(f"{name}: {current['qps']:.0f} qps vs baseline {before['qps']:.0f} qps")
+    return failures
+
+
+def print_report(results):
+    print(f"{results['queries']} queries x {results['rounds']} rounds")
+    print("\nPer-stage latency (process_query):")
+    print(f"  {'stage':<18}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for stage, s in results['stages'].items():
+        print(f"  {stage:<18}{s['mean_ms']:>10.3f}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}")
+
+    print("\nEnd-to-end:")
+    print(f"  {'target':<20}{'p50':>10}{'p95':>10}{'p99':>10}{'qps':>12}")
+    for name, s in results['targets'].items():
+        print(f"  {name:<20}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['qps']:>12.0f}")
+
+    if results['peak_rss_mb'] is not None:
+        print(f"\nPeak RSS: {results['peak_rss_mb']:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GFC financial chatbot pipeline")
+    parser.add_argument('--queries', default=DEFAULT_QUERIES, help="query corpus, one per line")
+    parser.add_argument('--rounds', type=int, default=10, help="passes over the corpus per target")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed regression as a fraction (default 0.25 = 25%%)")
+    parser.add_argument('--save-baseline', help="write the results as a new baseline")
+    args = parser.parse_args()
+
+    results = run(load_queries(args.queries), args.rounds)
+    print_report(results)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = check_regressions(results, json.load(f), args.threshold)
+        if failures:
+            print(f"\n❌ Regression beyond {args.threshold:.0%}:")
+            for failure in failures:
+                print(f"  - {failure}")
+            sys.exit(1)
+        print(f"\n✅ No regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
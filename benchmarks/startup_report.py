@@ -0,0 +1,166 @@
+"""
+Cold-start report for the chatbot API.
+
+Starts fresh interpreters under python -X importtime. Each one imports the
+Flask app, warms it up and answers one /chat request. The report covers:
+
+    imports      import time per top-level package (self time summed over
+                 its modules), including imports made while warming up
+    phases       one-off startup steps: store, nlp_load / nlp_restore, warm_up
+    milestones   imported, ready and first_response, counted from process start
+
+    python benchmarks/startup_report.py --runs 5
+    python benchmarks/startup_report.py --fast-start --nlp-snapshot /tmp/nlp-snapshot
+    python benchmarks/startup_report.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/startup_report.py --baseline benchmarks/startup_baseline.json --threshold 0.25
+
+Phase and milestone figures are medians over the runs. With --baseline, the
+exit status is 1 when the time to ready or to the first response rises by
+more than --threshold (a fraction).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, 'backend')
+
+DEFAULT_QUERY = "What was Microsoft's revenue in 2024?"
+
+# Milestones compared against a baseline
+TRACKED_MILESTONES = ('ready', 'first_response')
+
+# Runs in backend/ so that `import server` resolves as it does under gunicorn
+CHILD = """
+import json, sys
+import server
+server.warm_up()
+server.start_nlp_loader()
+response = server.app.test_client().post('/chat', json={'query': sys.argv[1]})
+from instrumentation import startup_report
+report = startup_report()
+report['status'] = response.status_code
+print(json.dumps(report))
+"""
+
+
+def parse_importtime(stderr):
+    """{top-level package: seconds} from -X importtime output (self times summed)"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        package = fields[2].strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(fields[0]) / 1e6
+    return packages
+
+
+def run_once(query, env):
+    """(startup report, import seconds per package) of one fresh server process"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, query],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"server process failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    if report['status'] != 200:
+        raise RuntimeError(f"/chat returned {report['status']} for {query!r}")
+    return report, parse_importtime(result.stderr)
+
+
+def median_of(dicts):
+    keys = sorted({key for d in dicts for key in d})
+    return {key: statistics.median(d[key] for d in dicts if key in d) for key in keys}
+
+
+def run(query, runs, env):
+    reports, imports = zip(*(run_once(query, env) for _ in range(runs)))
+    packages = median_of(imports)
+    return {
+        'query': query,
+        'runs': runs,
+        'fast_start': env.get('CHAT_FAST_START', '0') != '0',
+        'nlp_snapshot': env.get('CHAT_NLP_SNAPSHOT'),
+        'phases': median_of([report['phases'] for report in reports]),
+        'milestones': median_of([report['milestones'] for report in reports]),
+        'import_seconds': sum(packages.values()),
+        'imports': dict(sorted(packages.items(), key=lambda item: -item[1])),
+    }
+
+
+def check_regressions(results, baseline, threshold):
+    """Human-readable list of regressions beyond threshold"""
+    failures = []
+    for milestone in TRACKED_MILESTONES:
+        current = results['milestones'].get(milestone)
+        before = baseline.get('milestones', {}).get(milestone)
+        if current is not None and before and current > before * (1 + threshold):
+            failures.append(f"{milestone}: {current:.3f} s vs baseline {before:.3f} s")
+    return failures
+
+
+def print_report(results, top):
+    mode = "fast start" if results['fast_start'] else "full warm-up"
+    snapshot = f", spaCy snapshot in {results['nlp_snapshot']}" if results['nlp_snapshot'] else ""
+    print(f"{results['runs']} cold starts ({mode}{snapshot}), first query {results['query']!r}")
+
+    print(f"\nImport time by package (total {results['import_seconds']:.3f} s):")
+    for package, seconds in list(results['imports'].items())[:top]:
+        print(f"  {package:<28}{seconds * 1000:>10.1f} ms")
+
+    print("\nStartup phases:")
+    for phase, seconds in results['phases'].items():
+        print(f"  {phase:<28}{seconds * 1000:>10.1f} ms")
+
+    print("\nFrom process start to:")
+    for milestone, seconds in sorted(results['milestones'].items(), key=lambda item: item[1]):
+        print(f"  {milestone:<28}{seconds * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the GFC chatbot API's cold start")
+    parser.add_argument('--runs', type=int, default=3, help="fresh processes to start")
+    parser.add_argument('--query', default=DEFAULT_QUERY, help="first /chat query")
+    parser.add_argument('--fast-start', action='store_true', help="set CHAT_FAST_START=1")
+    parser.add_argument('--nlp-snapshot', help="set CHAT_NLP_SNAPSHOT to this directory")
+    parser.add_argument('--top', type=int, default=15, help="packages listed in the import table")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed regression as a fraction (default 0.25 = 25%%)")
+    parser.add_argument('--save-baseline', help="write the results as a new baseline")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.fast_start:
+        env['CHAT_FAST_START'] = '1'
+    if args.nlp_snapshot:
+        env['CHAT_NLP_SNAPSHOT'] = args.nlp_snapshot
+
+    results = run(args.query, args.runs, env)
+    print_report(results, args.top)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = check_regressions(results, json.load(f), args.threshold)
+        if failures:
+            print(f"\n❌ Regression beyond {args.threshold:.0%}:")
+            for failure in failures:
+                print(f"  - {failure}")
+            sys.exit(1)
+        print(f"\n✅ No regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Bulk Query Runner
+Client: Global Finance Corp (GFC)
+
+Answers a file of questions (one per line; blank and # lines are skipped)
+without the interactive loop, for overnight runs over large question sets:
+
+    python bulk_query.py questions.txt -o answers.jsonl --workers 4
+    cat questions.txt | python bulk_query.py - > answers.jsonl
+    python bulk_query.py questions.txt -o answers/ --format parquet
+    python bulk_query.py questions.txt -o answers.jsonl --resume
+
+Questions are read lazily and answered in chunks: each chunk's NER runs
+as one nlp.pipe call, and with --workers N chunks are spread over N
+processes, each with its own chatbot. At most two chunks per worker are
+in flight, so memory stays flat however long the input is. Results are
+written in input order, one record per question with its parse (intent,
+companies, metrics, years, filters, confidence) and the text response.
+
+JSONL goes to a single file (or stdout). Parquet goes to a directory of
+part files, one per chunk, and needs pyarrow. After every chunk the
+output is flushed and a checkpoint (<output>.checkpoint) records how far
+the input has been answered; --resume continues from there, dropping
+anything written after the last checkpoint.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from financial_store import DEFAULT_DATA_PATH
+
+CHUNK_SIZE = 256
+
+# Seconds between progress lines on stderr
+PROGRESS_INTERVAL = 5.0
+
+
+def read_queries(f, skip_lines=0):
+    """
+    Yield (line number, query, byte offset after the line) from a binary file
+
+    The first skip_lines lines are read past without being yielded.
+    """
+    offset = 0
+    for number, raw in enumerate(f, 1):
+        offset += len(raw)
+        if number <= skip_lines:
+            continue
+        query = raw.decode('utf-8', errors='replace').strip()
+        if query and not query.startswith('#'):
+            yield number, query, offset
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# One chatbot per process, built by init_worker()
+_bot = None
+
+
+def init_worker(data_path, semantic_fallback=False, canned_answers=False):
+    global _bot
+    from nlp_chatbot import NLPFinancialChatbot
+    _bot = NLPFinancialChatbot(data_path)
+    if canned_answers:
+        _bot.enable_canned_answers()
+    if semantic_fallback:
+        _bot.enable_semantic_fallback()
+
+
+def answer_chunk(items):
+    """Records for a chunk of (line, query) pairs, with all NER in one nlp.pipe call"""
+    from nlp_pipeline import get_nlp
+
+    canned = [_bot.canned_answer(query) for _, query in items]
+    ner = [i for i, (_, query) in enumerate(items) if canned[i] is None and _bot.needs_ner(query)]
+    docs = dict(zip(ner, get_nlp().pipe([items[i][1] for i in ner]))) if ner else {}
+
+    records = []
+    for i, (line, query) in enumerate(items):
+        if canned[i] is not None:
+            # Answered from the table, as process_query would, without parsing
+            records.append({
+                'line': line, 'query': query, 'intent': 'canned', 'companies': [], 'metrics': [],
+                'year_start': None, 'year_end': None, 'filters': [], 'top': None, 'ascending': False,
+                'confidence': 1.0, 'response': canned[i],
+            })
+            continue
+        parsed = _bot.parse(query, docs.get(i))
+        records.append({
+            'line': line,
+            'query': query,
+            'intent': parsed.intent,
+            'companies': list(parsed.companies),
+            'metrics': list(parsed.metrics),
+            'year_start': parsed.year_start,
+            'year_end': parsed.year_end,
+            'filters': [f"{metric} {op} {value:g}" for metric, op, value in parsed.filters],
+            'top': parsed.top,
+            'ascending': parsed.ascending,
+            'confidence': parsed.confidence,
+            'response': _bot.render(parsed),
+        })
+    return records
+
+
+class JSONLWriter:
+    """Appends records as JSON lines; position() is the byte size written so far"""
+
+    def __init__(self, path, resume=False, checkpoint=None):
+        self.path = path
+        if path is None:
+            self.file = sys.stdout.buffer
+            return
+        self.file = open(path, 'r+b' if resume else 'wb')
+        if resume:
+            # Anything after the checkpoint belongs to a chunk that was not recorded
+            self.file.truncate(checkpoint['output_bytes'])
+            self.file.seek(checkpoint['output_bytes'])
+
+    def write(self, records, first_line):
+        self.file.write(b''.join(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+                                 for record in records))
+        self.file.flush()
+
+    def position(self):
+        return self.file.tell() if self.path is not None else None
+
+    def close(self):
+        if self.path is not None:
+            self.file.close()
+
+
+class ParquetWriter:
+    """One part-<first line>.parquet file per chunk in a directory"""
+
+    def __init__(self, path, resume=False, checkpoint=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)") from None
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        # Fixed so that parts where a column is all null still share one schema
+        strings = pyarrow.list_(pyarrow.string())
+        self.schema = pyarrow.schema([
+            ('line', pyarrow.int64()), ('query', pyarrow.string()), ('intent', pyarrow.string()),
+            ('companies', strings), ('metrics', strings), ('year_start', pyarrow.string()),
+            ('year_end', pyarrow.string()), ('filters', strings), ('top', pyarrow.int64()),
+            ('ascending', pyarrow.bool_()), ('confidence', pyarrow.float64()), ('response', pyarrow.string()),
+        ])
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # A fresh run starts empty; a resumed one keeps the parts the
+        # checkpoint covers and drops any written after it
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet') and (
+                    not resume or self._first_line(name) > checkpoint['lines']):
+                os.remove(os.path.join(path, name))
+
+    @staticmethod
+    def _first_line(name):
+        # part-<first line>.parquet; anything else is not ours to drop on resume
+        try:
+            return int(name[len('part-'):-len('.parquet')])
+        except ValueError:
+            return 0
+
+    def write(self, records, first_line):
+        table = self.pa.Table.from_pylist(records, schema=self.schema)
+        part = os.path.join(self.path, f'part-{first_line:09d}.parquet')
+        # Written under a temporary name so a crash never leaves a torn part
+        self.pq.write_table(table, part + '.tmp')
+        os.replace(part + '.tmp', part)
+
+    def position(self):
+        return None
+
+    def close(self):
+        pass
+
+
+WRITERS = {'jsonl': JSONLWriter, 'parquet': ParquetWriter}
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+class Progress:
+    """Throughput and progress lines on stderr"""
+
+    def __init__(self, total_bytes=None, interval=PROGRESS_INTERVAL):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.answered = 0
+
+    def update(self, answered, offset, force=False):
+        self.answered += answered
+        now = time.perf_counter()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = now - self.started
+        rate = self.answered / elapsed if elapsed else 0.0
+        done = f" ({offset / self.total_bytes:.1%} of input)" if self.total_bytes else ""
+        print(f"{self.answered:,} queries answered{done}, {rate:,.0f} queries/s, {elapsed:,.0f}s elapsed",
+              file=sys.stderr, flush=True)
+
+
+def run(source, output, fmt='jsonl', workers=1, chunk_size=CHUNK_SIZE, resume=False,
+        data_path=DEFAULT_DATA_PATH, checkpoint_path=None, semantic_fallback=True,
+        canned_answers=True):
+    """Answer every query in source ('-' for stdin) and write the records to output"""
+    if output is None and (fmt != 'jsonl' or resume):
+        raise SystemExit("--output is required for Parquet output and for --resume")
+    checkpoint_path = checkpoint_path or (output + '.checkpoint' if output else None)
+
+    checkpoint = read_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+    if resume and checkpoint is None:
+        print("No checkpoint found; starting from the beginning", file=sys.stderr)
+    if checkpoint is not None:
+        # The checkpoint is only as good as the output it describes
+        written = checkpoint.get('output_bytes')
+        if not os.path.exists(output) or (written is not None and os.path.getsize(output) < written):
+            raise SystemExit(f"Cannot resume: {output} is missing or shorter than the checkpoint "
+                             f"expects; run without --resume to start over")
+        print(f"Resuming after input line {checkpoint['lines']:,}", file=sys.stderr)
+    elif checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    if source == '-':
+        infile, total_bytes = sys.stdin.buffer, None
+    else:
+        infile, total_bytes = open(source, 'rb'), os.path.getsize(source)
+
+    # Lines already answered are skipped, or seeked past when reading a file
+    skip = line_base = base_offset = 0
+    if checkpoint is not None:
+        if source != '-' and checkpoint.get('offset') is not None:
+            infile.seek(checkpoint['offset'])
+            base_offset, line_base = checkpoint['offset'], checkpoint['lines']
+        else:
+            skip = checkpoint['lines']
+
+    writer = WRITERS[fmt](output, resume=checkpoint is not None, checkpoint=checkpoint)
+    progress = Progress(total_bytes)
+
+    def flush_chunk(chunk, records):
+        """Write one finished chunk and move the checkpoint past it"""
+        line, _, offset = chunk[-1]
+        writer.write(records, chunk[0][0])
+        if checkpoint_path:
+            write_checkpoint(checkpoint_path, {
+                'input': source,
+                'lines': line,
+                'offset': base_offset + offset if source != '-' else None,
+                'output_bytes': writer.position(),
+            })
+        progress.update(len(records), base_offset + offset)
+
+    items = ((line_base + line, query, offset) for line, query, offset in read_queries(infile, skip))
+    chunks = chunked(items, chunk_size)
+    try:
+        if workers <= 1:
+            init_worker(data_path, semantic_fallback, canned_answers)
+            for chunk in chunks:
+                flush_chunk(chunk, answer_chunk([(line, query) for line, query, _ in chunk]))
+        else:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(workers, mp_context=ctx, initializer=init_worker,
+                                     initargs=(data_path, semantic_fallback, canned_answers)) as executor:
+                # Bounded window of in-flight chunks, written back in input order
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((chunk, executor.submit(answer_chunk, [(line, query) for line, query, _ in chunk])))
+                    if len(pending) >= 2 * workers:
+                        done, future = pending.popleft()
+                        flush_chunk(done, future.result())
+                while pending:
+                    done, future = pending.popleft()
+                    flush_chunk(done, future.result())
+    finally:
+        writer.close()
+        if infile is not sys.stdin.buffer:
+            infile.close()
+
+    progress.update(0, total_bytes or 0, force=True)
+    return progress.answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the GFC financial chatbot")
+    parser.add_argument('input', help="questions, one per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', help="JSONL file or Parquet directory (JSONL to stdout if omitted)")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (1 = answer in this process)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="questions per chunk and checkpoint")
+    parser.add_argument('--resume', action='store_true', help="continue after the last checkpoint")
+    parser.add_argument('--checkpoint', help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="financial data CSV")
+    parser.add_argument('--semantic-fallback', dest='semantic_fallback', action='store_true', default=True,
+                        help="match paraphrases and company aliases the keyword vocabularies miss "
+                             "(the default, as in the API)")
+    parser.add_argument('--no-semantic-fallback', dest='semantic_fallback', action='store_false',
+                        help="keyword vocabularies and NER only, like CHAT_SEMANTIC_FALLBACK=0")
+    parser.add_argument('--canned-answers', dest='canned_answers', action='store_true', default=True,
+                        help="answer questions found in canned_answers.jsonl verbatim (the default, as in the API)")
+    parser.add_argument('--no-canned-answers', dest='canned_answers', action='store_false',
+                        help="parse every question, even those in the canned Q&A table (like CHAT_CANNED_ANSWERS=0)")
+    args = parser.parse_args()
+
+    from nlp_pipeline import ModelUnavailable
+    try:
+        run(args.input, args.output, fmt=args.format, workers=args.workers, chunk_size=args.chunk_size,
+            resume=args.resume, data_path=args.data, checkpoint_path=args.checkpoint,
+            semantic_fallback=args.semantic_fallback, canned_answers=args.canned_answers)
+    except ModelUnavailable as exc:
+        raise SystemExit(f"⚠️  {exc}") from None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Indexed Fuzzy Company Resolver
+Client: Global Finance Corp (GFC)
+
+Fuzzy company matching used to score every alias on every query. Here the
+aliases are indexed by padded character trigrams; a query only scores the
+few candidates that share enough trigrams with it, using rapidfuzz's C
+scorers. With ~10k names and aliases a lookup stays well under 1 ms.
+"""
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+
+def trigrams(text):
+    """Padded character trigrams of every word ("appel" -> " ap", "app", ...)"""
+    grams = set()
+    for word in default_process(text).split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _TrigramIndex:
+    """Inverted trigram index over a list of strings"""
+
+    def __init__(self, strings):
+        self.strings = list(strings)
+        self.processed = [default_process(s) for s in self.strings]
+
+        postings = {}
+        sizes = np.zeros(len(self.strings), dtype=np.int32)
+        for i, s in enumerate(self.strings):
+            grams = trigrams(s)
+            sizes[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.sizes = np.maximum(sizes, 1)
+
+    def candidates(self, text, min_overlap, limit):
+        """Ids of strings sharing at least min_overlap of their trigrams with text"""
+        lists = [self.postings[g] for g in trigrams(text) if g in self.postings]
+        if not lists:
+            return []
+
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.strings))
+        overlap = hits / self.sizes
+        ids = np.flatnonzero(overlap >= min_overlap)
+        if len(ids) > limit:
+            ids = ids[np.argpartition(-overlap[ids], limit)[:limit]]
+        return ids
+
+
+class CompanyResolver:
+    """
+    Resolves free text or NER spans to canonical company names
+
+    Aliases (tickers, short names) are matched as whole strings; canonical
+    names are also searched for inside longer text to catch typos.
+    """
+
+    def __init__(self, aliases=None, min_overlap=0.3, max_candidates=32):
+        self.min_overlap = min_overlap
+        self.max_candidates = max_candidates
+        self._aliases = {}
+        self._alias_index = None
+        self._name_index = None
+        if aliases:
+            for alias, company in aliases.items():
+                self.add(alias, company)
+
+    def add(self, alias, company):
+        """Register an alias (the canonical name itself is always added too)"""
+        self._aliases.setdefault(alias.lower(), company)
+        self._aliases.setdefault(company.lower(), company)
+        self._alias_index = self._name_index = None
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def _indexes(self):
+        if self._alias_index is None:
+            self._alias_index = _TrigramIndex(self._aliases)
+            self._name_index = _TrigramIndex(sorted(set(self._aliases.values()), key=str.lower))
+        return self._alias_index, self._name_index
+
+    def _best(self, index, text, scorer, score_cutoff):
+        ids = index.candidates(text, self.min_overlap, self.max_candidates)
+        if len(ids) == 0:
+            return None
+
+        choices = [index.processed[i] for i in ids]
+        best = process.extractOne(default_process(text), choices, scorer=scorer,
+                                  processor=None, score_cutoff=score_cutoff)
+        if best is None:
+            return None
+        return index.strings[ids[best[2]]], best[1]
+
+    def resolve(self, name, score_cutoff=70):
+        """
+        Best company for a whole name (e.g. an NER span), or None
+
+        Returns (company, score); scores are rapidfuzz WRatio (0-100).
+        """
+        alias_index, _ = self._indexes()
+        found = self._best(alias_index, name, fuzz.WRatio, score_cutoff)
+        if found is None:
+            return None
+        return self._aliases[found[0]], found[1]
+
+    def search(self, text, score_cutoff=80):
+        """
+        Best company whose canonical name appears, possibly misspelt, in text
+
+        Returns (company, score); scores are rapidfuzz partial_ratio (0-100).
+        """
+        _, name_index = self._indexes()
+        return self._best(name_index, text, fuzz.partial_ratio, score_cutoff)
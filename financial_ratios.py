@@ -0,0 +1,258 @@
+"""
+BCG GenAI Consulting Project - Task 1 (Enhanced)
+Financial Ratio Pipeline
+Client: Global Finance Corp (GFC)
+
+The ratios and growth rates of financial_data_processed.csv, computed the
+same way for the Task 1 analysis and the chatbot:
+
+    ratio_metrics / growth_metrics   NumPy kernels over arrays of any shape;
+                                     FinancialDataStore derives its cube
+                                     columns with them
+    add_ratios / add_growth          the notebook's steps 2 and 3 on a
+                                     DataFrame (groupby-shift growth, no
+                                     row loops)
+    process_frame / process_csv      raw 10-K panel -> processed table,
+                                     the latter in chunks of bounded size
+
+Growth is the percentage change from the previous fiscal year of the same
+company, and is left empty when that year is missing; ratios with a zero
+denominator are left empty too.
+
+    python financial_ratios.py financial_data.csv financial_data_processed.csv
+    python financial_ratios.py panel.csv panel_processed.parquet --chunksize 500000
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+# Chatbot metric name -> Task 1 column
+METRIC_COLUMNS = {
+    'revenue': 'Total_Revenue',
+    'net_income': 'Net_Income',
+    'assets': 'Total_Assets',
+    'liabilities': 'Total_Liabilities',
+    'cash_flow': 'Operating_Cash_Flow',
+    'profit_margin': 'Profit_Margin_%',
+    'roa': 'ROA_%',
+    'debt_to_assets': 'Debt_to_Assets_Ratio',
+    'equity': 'Equity',
+    'roe': 'ROE_%',
+    'revenue_growth': 'Revenue_Growth_%',
+    'net_income_growth': 'Net_Income_Growth_%',
+    'assets_growth': 'Assets_Growth_%',
+    'cash_flow_growth': 'OCF_Growth_%',
+}
+
+COMPANY_COLUMN = 'Company'
+YEAR_COLUMN = 'Fiscal_Year'
+
+# Numeric copy of Fiscal_Year that the notebook adds
+NUMERIC_YEAR_COLUMN = 'Year'
+
+# Column order of financial_data_processed.csv
+PROCESSED_COLUMNS = [
+    COMPANY_COLUMN, YEAR_COLUMN, 'Total_Revenue', 'Net_Income', 'Total_Assets', 'Total_Liabilities',
+    'Operating_Cash_Flow', NUMERIC_YEAR_COLUMN, 'Profit_Margin_%', 'ROA_%', 'Debt_to_Assets_Ratio',
+    'Equity', 'ROE_%', 'Revenue_Growth_%', 'Net_Income_Growth_%', 'Assets_Growth_%', 'OCF_Growth_%',
+]
+
+# Ratios: name -> (numerator, denominator, scale)
+DERIVED_RATIOS = {
+    'profit_margin': ('net_income', 'revenue', 100),
+    'roa': ('net_income', 'assets', 100),
+    'debt_to_assets': ('liabilities', 'assets', 1),
+    'roe': ('net_income', 'equity', 100),
+}
+
+# Year-over-year growth columns: name -> base metric
+GROWTH_METRICS = {
+    'revenue_growth': 'revenue',
+    'net_income_growth': 'net_income',
+    'assets_growth': 'assets',
+    'cash_flow_growth': 'cash_flow',
+}
+
+# Rows per chunk in process_csv
+CHUNK_SIZE = 100_000
+
+
+def safe_ratio(numerator, denominator):
+    """numerator / denominator, NaN where the denominator is 0"""
+    return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+
+def ratio_metrics(columns):
+    """
+    Yield (name, values) for equity and each DERIVED_RATIOS ratio that the
+    metric -> array mapping columns can supply
+
+    columns is read again after every yield, so a caller may store each
+    result in it (merged with existing values, say) before the ratios that
+    depend on it (roe on equity) are computed.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'assets' in columns and 'liabilities' in columns:
+            yield 'equity', columns['assets'] - columns['liabilities']
+        for name, (numerator, denominator, scale) in DERIVED_RATIOS.items():
+            if numerator in columns and denominator in columns:
+                yield name, safe_ratio(columns[numerator], columns[denominator]) * scale
+
+
+def growth_metrics(current, previous, consecutive):
+    """
+    Yield (name, values) for each GROWTH_METRICS column: the % change from
+    previous[base] to current[base], NaN where consecutive is False (the
+    previous value is not from the year before)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, base in GROWTH_METRICS.items():
+            if base in current and base in previous:
+                change = (safe_ratio(current[base], previous[base]) - 1) * 100
+                yield name, np.where(consecutive, change, np.nan)
+
+
+def add_ratios(df):
+    """df with Equity and the ratio columns (re)computed from its raw columns"""
+    df = df.copy()
+    columns = {metric: df[column].to_numpy() for metric, column in METRIC_COLUMNS.items() if column in df}
+    for name, values in ratio_metrics(columns):
+        columns[name] = values
+        df[METRIC_COLUMNS[name]] = values
+    return df
+
+
+def add_growth(df):
+    """df sorted by company and year, with the *_Growth_% columns (re)computed"""
+    import pandas as pd
+
+    df = df.copy()
+    df[NUMERIC_YEAR_COLUMN] = pd.to_numeric(df[YEAR_COLUMN])
+    df = df.sort_values([COMPANY_COLUMN, NUMERIC_YEAR_COLUMN], kind='stable')
+
+    bases = [METRIC_COLUMNS[base] for base in GROWTH_METRICS.values() if METRIC_COLUMNS[base] in df]
+    previous = df.groupby(COMPANY_COLUMN, sort=False)[bases + [NUMERIC_YEAR_COLUMN]].shift()
+    consecutive = (df[NUMERIC_YEAR_COLUMN] - previous[NUMERIC_YEAR_COLUMN]).to_numpy() == 1
+
+    metrics = {METRIC_COLUMNS[base]: base for base in GROWTH_METRICS.values()}
+    current = {metrics[column]: df[column].to_numpy(dtype=float) for column in bases}
+    before = {metrics[column]: previous[column].to_numpy(dtype=float) for column in bases}
+    for name, values in growth_metrics(current, before, consecutive):
+        df[METRIC_COLUMNS[name]] = values
+    return df
+
+
+def process_frame(df):
+    """Processed Task 1 table (PROCESSED_COLUMNS that df can supply) from raw figures"""
+    df = add_growth(add_ratios(df))
+    return df[[column for column in PROCESSED_COLUMNS if column in df]].reset_index(drop=True)
+
+
+class _CSVSink:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _ParquetSink:
+    """One row group per chunk; numeric columns are float64 so every chunk shares a schema"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        self.pa = pyarrow
+        self.path = path
+        self.writer = None
+        self._parquet = pyarrow.parquet
+
+    def write(self, frame):
+        if self.writer is None:
+            pa = self.pa
+            fields = [(column, pa.string() if column in (COMPANY_COLUMN, YEAR_COLUMN)
+                       else pa.int64() if column == NUMERIC_YEAR_COLUMN else pa.float64())
+                      for column in frame.columns]
+            self.schema = pa.schema(fields)
+            self.writer = self._parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(self.pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _sink(path):
+    return _ParquetSink(path) if os.path.splitext(path)[1].lower() == '.parquet' else _CSVSink(path)
+
+
+def process_csv(source, dest, chunksize=CHUNK_SIZE):
+    """
+    Stream a raw Task 1 CSV through process_frame into dest (.csv or .parquet)
+
+    The source is read chunksize rows at a time, so memory does not grow
+    with the file. Each company's rows must be contiguous (any order of
+    years): the rows of the last company in a chunk are held back until
+    the next chunk, so its growth rates see every year. Rows are sorted by
+    company and year within each chunk written (the whole table when it
+    fits in one chunk). Returns the number of rows written.
+    """
+    import pandas as pd
+
+    sink = _sink(dest)
+    finished = set()
+    carry = None
+    written = 0
+
+    def flush(frame):
+        nonlocal written
+        companies = frame[COMPANY_COLUMN].to_numpy()
+        blocks = companies[np.r_[True, companies[1:] != companies[:-1]]]
+        if len(set(blocks)) != len(blocks) or finished.intersection(blocks):
+            raise ValueError(f"{source}: rows of each company must be contiguous")
+        finished.update(blocks)
+        sink.write(process_frame(frame))
+        written += len(frame)
+
+    try:
+        # round_trip keeps already processed figures bit-exact when re-read
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype={YEAR_COLUMN: str},
+                                 float_precision='round_trip'):
+            # One chunk behind, so the last chunk is never split
+            if carry is not None:
+                companies = carry[COMPANY_COLUMN].to_numpy()
+                others = np.flatnonzero(companies != companies[-1])
+                split = others[-1] + 1 if len(others) else 0
+                if split:
+                    flush(carry.iloc[:split])
+                chunk = pd.concat([carry.iloc[split:], chunk], ignore_index=True)
+            carry = chunk
+        if carry is not None and len(carry):
+            flush(carry)
+    finally:
+        sink.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the Task 1 ratios and growth rates for a 10-K panel")
+    parser.add_argument('source', help="CSV with Company, Fiscal_Year and the raw 10-K columns")
+    parser.add_argument('dest', help="processed table (.csv, or .parquet with pyarrow)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="rows read per chunk")
+    args = parser.parse_args()
+    rows = process_csv(args.source, args.dest, args.chunksize)
+    print(f"✅ {rows:,} rows written to {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,699 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Columnar Financial Data Store
+Client: Global Finance Corp (GFC)
+
+Holds the chatbot's financial facts as one dense float64 cube indexed by
+integer-coded (company, year, metric) axes. Missing values are NaN, so a
+whole-year or whole-company slice can be read without per-key lookups.
+At 5,000 tickers x 25 years x 30 metrics the cube is ~30 MB.
+
+The Task 1 CSVs are the single source of truth. load_store() parses a CSV
+once into a binary snapshot (a .npy cube plus a JSON manifest) and
+memory-maps it on later starts, so every server worker shares the same
+pages through the OS page cache. Derived ratios, growth rates and
+per-(year, metric) rankings are computed once when the snapshot is built.
+The snapshot is rebuilt only when the source file's mtime/size and content
+hash say it changed.
+
+refresh_store() applies edits to the CSV to a running store: rows are
+matched by a checksum of their source line, so only added, edited or
+removed rows are parsed, and only their derived metrics, (year, metric)
+rankings and trends are recomputed. The result is a new store object;
+readers holding the old one are unaffected.
+"""
+
+import csv
+import hashlib
+import json
+import operator
+import os
+import re
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from financial_ratios import (COMPANY_COLUMN, GROWTH_METRICS, METRIC_COLUMNS, NUMERIC_YEAR_COLUMN,
+                              YEAR_COLUMN, growth_metrics, ratio_metrics)
+
+# Task 1 data lives next to this file
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'Task1_Financial_Analysis', 'financial_data_processed.csv')
+
+# Snapshots are written here unless a cache_dir is given
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'Task1_Financial_Analysis', '.cache')
+
+SNAPSHOT_VERSION = 4
+
+# Manifest keys naming the .npy files of one snapshot
+SNAPSHOT_FILES = ('values_file', 'rank_file', 'base_file', 'hashes_file')
+
+# Task 1 CSV column -> chatbot metric name
+COLUMN_METRICS = {column: metric for metric, column in METRIC_COLUMNS.items()}
+
+# Key columns, plus the notebook's duplicate of Fiscal_Year
+SKIPPED_COLUMNS = {COMPANY_COLUMN, YEAR_COLUMN, NUMERIC_YEAR_COLUMN}
+
+
+# Filter operators accepted by FinancialDataStore.select()
+COMPARISON_OPS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+                  '==': operator.eq, '!=': operator.ne}
+
+
+def column_metric(column):
+    """Map a CSV header to a metric name, snake-casing unknown columns"""
+    if column in COLUMN_METRICS:
+        return COLUMN_METRICS[column]
+    return re.sub(r'[^0-9a-z]+', '_', column.lower().replace('%', '')).strip('_')
+
+
+def _line_hash(line):
+    """Non-zero 64-bit checksum of one CSV line (0 marks "no row")"""
+    data = line.rstrip('\r\n').encode('utf-8')
+    return (zlib.adler32(data) << 32 | zlib.crc32(data)) | 1
+
+
+def _tracked_lines(f, last):
+    # Feeds csv.reader while remembering the line each row came from
+    # (Task 1 CSVs have no quoted newlines, so one row is one line)
+    for line in f:
+        last[0] = line
+        yield line
+
+
+def _parse_cells(row, metric_cols):
+    for i in metric_cols:
+        cell = row[i].strip() if i < len(row) else ''
+        yield float(cell) if cell else np.nan
+
+
+def python_values(values, integral=False):
+    """
+    Python list of a float64 vector: ints when integral, None where NaN
+
+    The vectorised form of FinancialDataStore.get() for a whole column.
+    """
+    missing = np.isnan(values)
+    if integral:
+        out = np.where(missing, 0, values).astype(np.int64).tolist()
+    else:
+        out = values.tolist()
+    for i in np.flatnonzero(missing).tolist():
+        out[i] = None
+    return out
+
+
+def _differs(a, b):
+    """Elementwise a != b where NaN equals NaN"""
+    return ~((a == b) | (np.isnan(a) & np.isnan(b)))
+
+
+def _derive(metrics, values, years):
+    """(metrics, values) with equity, DERIVED_RATIOS and GROWTH_METRICS added"""
+    metrics = list(metrics)
+    columns = {name: values[:, :, i] for i, name in enumerate(metrics)}
+
+    def put(name, derived):
+        if name in columns:
+            derived = np.where(np.isnan(derived), columns[name], derived)
+        else:
+            metrics.append(name)
+        columns[name] = derived
+
+    for name, derived in ratio_metrics(columns):
+        put(name, derived)
+
+    # Year-over-year growth only between consecutive fiscal years
+    bases = [base for base in GROWTH_METRICS.values() if base in columns]
+    current = {base: columns[base][:, 1:] for base in bases}
+    previous = {base: columns[base][:, :-1] for base in bases}
+    consecutive = np.diff(np.asarray(years)) == 1
+    for name, change in growth_metrics(current, previous, consecutive):
+        growth = np.full_like(columns[GROWTH_METRICS[name]], np.nan)
+        growth[:, 1:] = change
+        put(name, growth)
+
+    if not metrics:
+        return metrics, values
+    return metrics, np.stack([columns[name] for name in metrics], axis=2)
+
+
+def _compute_trends(values):
+    """(first year pos, last year pos, % change) per (company, metric) of a cube"""
+    present = ~np.isnan(values)
+    n_years = values.shape[1]
+    first = present.argmax(axis=1)
+    last = n_years - 1 - present[:, ::-1, :].argmax(axis=1)
+
+    if n_years == 0:
+        return first, last, np.full(first.shape, np.nan)
+    c, m = np.indices(first.shape)
+    start = values[c, first, m]
+    end = values[c, last, m]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (end - start) / start * 100
+    valid = (first < last) & (start != 0) & (end != 0) & ~np.isnan(change)
+    return first, last, np.where(valid, change, np.nan)
+
+
+class SourceRows:
+    """
+    The CSV rows a store was derived from
+
+    metrics/values are the base columns as parsed (before derivation may
+    overwrite some of them); hashes holds one _line_hash per (company, year)
+    line, 0 where the CSV has no line.
+    """
+
+    def __init__(self, metrics, values, hashes):
+        self.metrics = list(metrics)
+        self.values = values
+        self.hashes = hashes
+
+
+class FinancialDataStore:
+    """
+    Dense company x year x metric array with dictionary-coded axes
+
+    Rankings for every (year, metric) and the first-to-last-year change for
+    every (company, metric) are precomputed once, so comparison, top-N and
+    trend queries are lookups rather than per-request sorts.
+    """
+
+    def __init__(self, companies, years, metrics, values=None, integral_metrics=None, rank_order=None,
+                 trends=None):
+        # Names are interned: every response that mentions a company, year
+        # or metric shares these objects instead of building its own copies
+        self.companies = [sys.intern(str(name)) for name in companies]
+        self.years = sorted(int(y) for y in years)
+        self.year_labels = [sys.intern(str(year)) for year in self.years]
+        self.metrics = [sys.intern(name) for name in metrics]
+
+        self.company_index = {name: i for i, name in enumerate(self.companies)}
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+        self.metric_index = {name: i for i, name in enumerate(self.metrics)}
+
+        shape = (len(self.companies), len(self.years), len(self.metrics))
+        if values is None:
+            self.values = np.full(shape, np.nan, dtype=np.float64)
+        else:
+            self.values = np.asarray(values, dtype=np.float64)
+            if self.values.shape != shape:
+                raise ValueError(f"values has shape {self.values.shape}, expected {shape}")
+
+        if integral_metrics is None:
+            self._refresh_integral_flags()
+        else:
+            self.integral_metrics = np.asarray(integral_metrics, dtype=bool)
+
+        self.rank_order = self._build_rankings() if rank_order is None else rank_order
+        self.rank_count = (~np.isnan(self.values)).sum(axis=0)
+        if trends is None:
+            self._build_trends()
+        else:
+            self.trend_first, self.trend_last, self.trend_change = trends
+
+        # Source content hash, set by load_store() / refresh_store()
+        self.version = None
+        # Base CSV rows behind the cube (SourceRows), for incremental refresh
+        self.source = None
+
+    @classmethod
+    def from_csv(cls, path):
+        """Parse a Task 1 schema CSV in one streaming pass"""
+        with open(path, newline='', encoding='utf-8') as f:
+            last_line = [None]
+            reader = csv.reader(_tracked_lines(f, last_line))
+            header = next(reader)
+            company_col = header.index(COMPANY_COLUMN)
+            year_col = header.index(YEAR_COLUMN)
+            metric_cols = [i for i, name in enumerate(header) if name not in SKIPPED_COLUMNS]
+
+            # Dictionary-encode companies as we go; values stay in flat C arrays
+            company_codes = {}
+            row_companies = array('q')
+            row_years = array('q')
+            row_hashes = array('Q')
+            columns = [array('d') for _ in metric_cols]
+
+            for row in reader:
+                if not row:
+                    continue
+                row_companies.append(company_codes.setdefault(row[company_col].strip(), len(company_codes)))
+                row_years.append(int(float(row[year_col])))
+                row_hashes.append(_line_hash(last_line[0]))
+                for column, value in zip(columns, _parse_cells(row, metric_cols)):
+                    column.append(value)
+
+        row_years = np.frombuffer(row_years, dtype=np.int64) if row_years else np.array([], dtype=np.int64)
+        years = np.unique(row_years)
+        values = np.full((len(company_codes), len(years), len(metric_cols)), np.nan)
+        hashes = np.zeros((len(company_codes), len(years)), dtype=np.uint64)
+
+        # Scatter every column into the cube at once
+        c = np.frombuffer(row_companies, dtype=np.int64) if row_companies else np.array([], dtype=np.int64)
+        y = np.searchsorted(years, row_years)
+        for m, column in enumerate(columns):
+            values[c, y, m] = np.frombuffer(column, dtype=np.float64) if column else []
+        hashes[c, y] = np.frombuffer(row_hashes, dtype=np.uint64) if row_hashes else []
+
+        metrics = [column_metric(header[i]) for i in metric_cols]
+        store = cls(company_codes, years, metrics, values)
+        store.source = SourceRows(metrics, values, hashes)
+        return store
+
+    def with_derived_metrics(self):
+        """
+        New store with every ratio and growth rate derivable from the base columns.
+
+        Cells the source already filled are kept where an input is missing.
+        """
+        metrics, values = _derive(self.metrics, self.values, self.years)
+        store = FinancialDataStore(self.companies, self.years, metrics, values)
+        store.source = self.source
+        return store
+
+    def apply_csv(self, path):
+        """
+        Bring this derived store up to date with an edited CSV.
+
+        Returns (store, changed companies). Only lines with a new checksum
+        are parsed, and only their companies' derived metrics, trends and
+        (year, metric) rankings are recomputed, in a new store. A new year
+        or column, a removed company or a store without source rows falls
+        back to a full rebuild (changed=None).
+        """
+        src = self.source
+        with open(path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader([f.readline()]))
+            company_col = header.index(COMPANY_COLUMN)
+            year_col = header.index(YEAR_COLUMN)
+            metric_cols = [i for i, name in enumerate(header) if name not in SKIPPED_COLUMNS]
+            if src is None or [column_metric(header[i]) for i in metric_cols] != src.metrics:
+                return self._rebuilt(path)
+
+            # A line whose checksum is already known is unchanged (the
+            # checksum covers the company and year cells too), so only new
+            # or edited lines are parsed at all
+            known = set(np.asarray(src.hashes)[np.asarray(src.hashes) != 0].tolist())
+            seen = []
+            edits = {}
+            for line in f:
+                line_hash = _line_hash(line)
+                if line_hash in known:
+                    seen.append(line_hash)
+                    continue
+                row = next(csv.reader([line]), None)
+                if not row:
+                    continue
+                y = self.year_index.get(int(float(row[year_col])))
+                if y is None:
+                    return self._rebuilt(path)
+                edits[row[company_col].strip(), y] = (line_hash, list(_parse_cells(row, metric_cols)))
+
+        present = src.hashes != 0
+        removed = present & ~np.isin(src.hashes, np.array(seen, dtype=np.uint64))
+        edited = {company for company, _ in edits}
+        kept = (present & ~removed).any(axis=1)
+        if any(had and not kept[c] and self.companies[c] not in edited
+               for c, had in enumerate(present.any(axis=1))):
+            return self._rebuilt(path)
+        if not edits and not removed.any():
+            return self, set()
+
+        added = list(dict.fromkeys(company for company, _ in edits if company not in self.company_index))
+        companies = self.companies + added
+        company_index = {name: i for i, name in enumerate(companies)}
+
+        base = np.full((len(companies),) + src.values.shape[1:], np.nan)
+        base[:len(self.companies)] = src.values
+        hashes = np.zeros((len(companies), len(self.years)), dtype=np.uint64)
+        hashes[:len(self.companies)] = src.hashes
+        base[removed.nonzero()] = np.nan
+        hashes[removed.nonzero()] = 0
+        for (company, y), (row_hash, cells) in edits.items():
+            base[company_index[company], y] = cells
+            hashes[company_index[company], y] = row_hash
+
+        rows = np.union1d(np.flatnonzero(removed.any(axis=1)),
+                          [company_index[company] for company, _ in edits]).astype(np.intp)
+        metrics, derived = _derive(src.metrics, base[rows], self.years)
+        if metrics != self.metrics:
+            return self._rebuilt(path)
+
+        values = np.empty((len(companies), len(self.years), len(self.metrics)))
+        values[:len(self.companies)] = self.values
+        values[rows] = derived
+
+        if added:
+            rank_order = None
+        else:
+            # Re-sort only the (year, metric) columns whose values moved
+            rank_order = np.array(self.rank_order)
+            touched = np.argwhere(_differs(self.values[rows], derived).any(axis=0))
+            if len(touched):
+                ys, ms = touched[:, 0], touched[:, 1]
+                keyed = np.where(np.isnan(values[:, ys, ms]), np.inf, -values[:, ys, ms]).T
+                rank_order[ys, ms] = np.argsort(keyed, axis=1, kind='stable')
+
+        old_trends = (self.trend_first, self.trend_last, self.trend_change)
+        trends = []
+        for old, fresh in zip(old_trends, _compute_trends(derived)):
+            new = np.empty((len(companies), len(self.metrics)), dtype=old.dtype)
+            new[:len(self.companies)] = old
+            new[rows] = fresh
+            trends.append(new)
+
+        store = FinancialDataStore(companies, self.years, self.metrics, values,
+                                   rank_order=rank_order, trends=trends)
+        store.source = SourceRows(src.metrics, base, hashes)
+        return store, {companies[i] for i in rows}
+
+    @staticmethod
+    def _rebuilt(path):
+        return FinancialDataStore.from_csv(path).with_derived_metrics(), None
+
+    def _build_rankings(self):
+        # (year, metric, company) order, best first, missing values last
+        keyed = np.where(np.isnan(self.values), np.inf, -self.values)
+        return np.argsort(keyed.transpose(1, 2, 0), axis=2, kind='stable').astype(np.int32)
+
+    def _build_trends(self):
+        # First/last reported year per (company, metric) and the % change between them
+        self.trend_first, self.trend_last, self.trend_change = _compute_trends(self.values)
+
+    def _refresh_integral_flags(self):
+        # Metrics reported in whole millions come back as ints so that text
+        # and JSON output match what the hand-entered data used to produce
+        with np.errstate(invalid='ignore'):
+            whole = np.isnan(self.values) | (self.values == np.round(self.values))
+        self.integral_metrics = whole.all(axis=(0, 1)) if self.values.size else np.ones(len(self.metrics), bool)
+
+    def _to_python(self, metric_idx, value):
+        if self.integral_metrics[metric_idx]:
+            return int(value)
+        return float(value)
+
+    def is_integral(self, metric):
+        """True if metric's values are reported as ints"""
+        m = self.metric_index.get(metric)
+        return m is not None and bool(self.integral_metrics[m])
+
+    def _year_pos(self, year):
+        try:
+            return self.year_index.get(int(year))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, company, year, metric):
+        """Single value lookup; returns None when missing"""
+        c = self.company_index.get(company)
+        y = self._year_pos(year)
+        m = self.metric_index.get(metric)
+        if c is None or y is None or m is None:
+            return None
+
+        value = self.values[c, y, m]
+        if np.isnan(value):
+            return None
+        return self._to_python(m, value)
+
+    def get_many(self, keys):
+        """Vectorised get() for a list of (company, year, metric) triples"""
+        c = np.array([self.company_index.get(company, -1) for company, _, _ in keys], dtype=np.int64)
+        year_pos = [self._year_pos(year) for _, year, _ in keys]
+        y = np.array([-1 if pos is None else pos for pos in year_pos], dtype=np.int64)
+        m = np.array([self.metric_index.get(metric, -1) for _, _, metric in keys], dtype=np.int64)
+
+        found = (c >= 0) & (y >= 0) & (m >= 0)
+        values = np.full(len(keys), np.nan)
+        values[found] = self.values[c[found], y[found], m[found]]
+
+        return [None if np.isnan(v) else self._to_python(mi, v) for v, mi in zip(values, m)]
+
+    def year_slice(self, year, metric):
+        """All companies for one (year, metric) as a float64 vector"""
+        y = self._year_pos(year)
+        m = self.metric_index.get(metric)
+        if y is None or m is None:
+            return None
+        return self.values[:, y, m]
+
+    def values_at(self, rows, year, metric):
+        """float64 vector of metric in year for company positions rows (NaN when missing)"""
+        column = self.year_slice(year, metric)
+        if column is None:
+            return np.full(len(rows), np.nan)
+        return column[rows]
+
+    def company_series(self, company, metric):
+        """All years for one (company, metric) as a float64 vector"""
+        c = self.company_index.get(company)
+        m = self.metric_index.get(metric)
+        if c is None or m is None:
+            return None
+        return self.values[c, :, m]
+
+    def select(self, year, metric, filters=(), companies=None, ascending=False, top=None):
+        """
+        Company positions for a year ranked by metric, as an int array
+
+        filters are (metric, op, value) triples that must all hold in that
+        year; companies restricts the universe. Companies missing the sort
+        metric are dropped. Runs on the precomputed ranking plus boolean
+        masks, so no per-company Python loop is involved.
+        """
+        y = self._year_pos(year)
+        m = self.metric_index.get(metric)
+        if y is None or m is None:
+            return np.empty(0, dtype=np.int32)
+
+        order = self.rank_order[y, m, :self.rank_count[y, m]]
+        if ascending:
+            order = order[::-1]
+
+        keep = None
+        for filter_metric, op, value in filters:
+            f = self.metric_index.get(filter_metric)
+            if f is None:
+                return np.empty(0, dtype=np.int32)
+            with np.errstate(invalid='ignore'):
+                passed = COMPARISON_OPS[op](self.values[:, y, f], value)
+            keep = passed if keep is None else keep & passed
+        if companies is not None:
+            wanted = np.zeros(len(self.companies), dtype=bool)
+            wanted[[self.company_index[c] for c in companies if c in self.company_index]] = True
+            keep = wanted if keep is None else keep & wanted
+
+        if keep is not None:
+            order = order[keep[order]]
+        return order if top is None else order[:top]
+
+    def trend(self, company, metric, start=None, end=None):
+        """(first_year, last_year, % change) across reported years, or None
+
+        The full-span change is precomputed; a start/end range is read from the slice.
+        """
+        c = self.company_index.get(company)
+        m = self.metric_index.get(metric)
+        if c is None or m is None:
+            return None
+
+        if start is None and end is None:
+            if np.isnan(self.trend_change[c, m]):
+                return None
+            return (self.year_labels[self.trend_first[c, m]], self.year_labels[self.trend_last[c, m]],
+                    float(self.trend_change[c, m]))
+
+        series = self.series(company, metric, start, end)
+        if len(series) < 2:
+            return None
+        (first_year, start_val), (last_year, end_val) = series[0], series[-1]
+        if not start_val or not end_val:
+            return None
+        return first_year, last_year, (end_val - start_val) / start_val * 100
+
+    def _year_span(self, start=None, end=None):
+        # Axis positions [lo, hi) covering start..end (inclusive, either may be None)
+        lo = 0 if start is None else bisect_left(self.years, int(start))
+        hi = len(self.years) if end is None else bisect_right(self.years, int(end))
+        return lo, hi
+
+    def series_values(self, company, metric, start=None, end=None):
+        """(year labels, float64 values) in chronological order, missing years dropped"""
+        column = self.company_series(company, metric)
+        if column is None:
+            return [], np.empty(0)
+
+        lo, hi = self._year_span(start, end)
+        present = lo + np.flatnonzero(~np.isnan(column[lo:hi]))
+        return [self.year_labels[i] for i in present], column[present]
+
+    def series(self, company, metric, start=None, end=None):
+        """(year, value) pairs in chronological order, missing years dropped"""
+        labels, values = self.series_values(company, metric, start, end)
+        return list(zip(labels, python_values(values, self.is_integral(metric))))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot_paths(source_path, cache_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, stem + '.manifest.json'), stem
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def build_snapshot(source_path, cache_dir=DEFAULT_CACHE_DIR, digest=None):
+    """Parse a CSV, derive ratios/rankings and write its binary snapshot; returns the manifest"""
+    store = FinancialDataStore.from_csv(source_path).with_derived_metrics()
+    return write_snapshot(store, source_path, cache_dir, digest or _file_digest(source_path))
+
+
+def write_snapshot(store, source_path, cache_dir, digest):
+    """Write an already derived store as the snapshot of source_path; returns the manifest"""
+    stat = os.stat(source_path)
+    manifest_path, stem = _snapshot_paths(source_path, cache_dir)
+
+    # Content-addressed cube file, so the manifest swap below is the commit point
+    values_file = f"{stem}.{digest[:16]}.npy"
+    rank_file = f"{stem}.{digest[:16]}.rank.npy"
+    base_file = f"{stem}.{digest[:16]}.base.npy"
+    hashes_file = f"{stem}.{digest[:16]}.rows.npy"
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = _read_manifest(manifest_path)
+    _write_atomic(os.path.join(cache_dir, values_file), lambda f: np.save(f, store.values))
+    _write_atomic(os.path.join(cache_dir, rank_file), lambda f: np.save(f, store.rank_order))
+    _write_atomic(os.path.join(cache_dir, base_file), lambda f: np.save(f, store.source.values))
+    _write_atomic(os.path.join(cache_dir, hashes_file), lambda f: np.save(f, store.source.hashes))
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'source': os.path.abspath(source_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_sha256': digest,
+        'values_file': values_file,
+        'rank_file': rank_file,
+        'base_file': base_file,
+        'hashes_file': hashes_file,
+        'base_metrics': store.source.metrics,
+        'companies': store.companies,
+        'years': store.years,
+        'metrics': store.metrics,
+        'integral_metrics': store.integral_metrics.tolist(),
+    }
+    _write_manifest(manifest_path, manifest)
+
+    # Drop cubes from builds before the previous one. The previous build's
+    # files stay until the next write: processes that have not reloaded yet
+    # may still map them, or be about to from the manifest they read.
+    keep = {values_file, rank_file, base_file, hashes_file}
+    if previous is not None:
+        keep.update(previous[key] for key in SNAPSHOT_FILES)
+    for name in os.listdir(cache_dir):
+        if name.startswith(stem + '.') and name.endswith('.npy') and name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+    return manifest
+
+
+def _write_manifest(manifest_path, manifest):
+    _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+
+def load_store(source_path=DEFAULT_DATA_PATH, cache_dir=DEFAULT_CACHE_DIR, mmap=True):
+    """
+    Load a CSV through its binary snapshot, rebuilding it only when stale.
+    
+    The cube is memory-mapped read-only by default.
+    """
+    manifest_path, _ = _snapshot_paths(source_path, cache_dir)
+    manifest = _read_manifest(manifest_path)
+    stat = os.stat(source_path)
+
+    if manifest is not None and (manifest['source_size'] != stat.st_size
+                                 or manifest['source_mtime_ns'] != stat.st_mtime_ns):
+        # Touched but possibly unchanged: the content hash decides
+        digest = _file_digest(source_path)
+        if digest == manifest['source_sha256']:
+            manifest['source_size'] = stat.st_size
+            manifest['source_mtime_ns'] = stat.st_mtime_ns
+            _write_manifest(manifest_path, manifest)
+        else:
+            manifest = build_snapshot(source_path, cache_dir, digest)
+
+    if manifest is None or not all(os.path.exists(os.path.join(cache_dir, manifest[key]))
+                                   for key in SNAPSHOT_FILES):
+        manifest = build_snapshot(source_path, cache_dir)
+
+    mmap_mode = 'r' if mmap else None
+    values = np.load(os.path.join(cache_dir, manifest['values_file']), mmap_mode=mmap_mode)
+    rank_order = np.load(os.path.join(cache_dir, manifest['rank_file']), mmap_mode=mmap_mode)
+    store = FinancialDataStore(manifest['companies'], manifest['years'], manifest['metrics'],
+                               values=values, integral_metrics=manifest['integral_metrics'],
+                               rank_order=rank_order)
+    store.version = manifest['source_sha256']
+    store.source = SourceRows(manifest['base_metrics'],
+                              np.load(os.path.join(cache_dir, manifest['base_file']), mmap_mode=mmap_mode),
+                              np.load(os.path.join(cache_dir, manifest['hashes_file']), mmap_mode=mmap_mode))
+    return store
+
+
+def refresh_store(store, source_path=DEFAULT_DATA_PATH, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Bring a loaded store up to date with its (edited) CSV.
+
+    Returns (store, changed companies): the same store and an empty set if
+    the file content is unchanged, otherwise a new store built with
+    FinancialDataStore.apply_csv() (changed is None after a full rebuild).
+    The snapshot is rewritten from the result unless another process has
+    already done so, so the next load_store() maps it directly.
+    """
+    digest = _file_digest(source_path)
+    if digest == store.version:
+        return store, set()
+
+    new_store, changed = store.apply_csv(source_path)
+    new_store.version = digest
+
+    manifest_path, _ = _snapshot_paths(source_path, cache_dir)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or manifest['source_sha256'] != digest:
+        write_snapshot(new_store, source_path, cache_dir, digest)
+    return new_store, changed
+
+
+if __name__ == "__main__":
+    # python financial_store.py [data.csv] -> (re)build its snapshot
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATA_PATH
+    manifest = build_snapshot(path)
+    print(f"Snapshot written: {len(manifest['companies'])} companies, "
+          f"{len(manifest['years'])} years, {len(manifest['metrics'])} metrics -> {manifest['values_file']}")
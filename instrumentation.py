@@ -0,0 +1,275 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Hot-Path Instrumentation
+Client: Global Finance Corp (GFC)
+
+Latency histograms for each chatbot stage (vocabulary matching, years,
+company fallback, parse, render, JSON handlers) in Prometheus text format,
+plus an opt-in sampling profiler that writes folded stacks (flamegraph.pl /
+speedscope input) for slow requests.
+
+A startup clock records how long one-off steps take (loading the data and
+the model, warming up) and when milestones (ready, first response) are
+reached, counted from process start.
+
+Timing is on unless CHAT_METRICS=0. When it is off, a timed stage costs
+one flag check. The profiler starts only when CHAT_PROFILE_SLOW_MS is set.
+"""
+
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+enabled = os.environ.get('CHAT_METRICS', '1') != '0'
+
+# Upper bounds in seconds; the chatbot's stages run from microseconds to tens of ms
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _process_start():
+    """perf_counter() value at process start (Linux), else now"""
+    try:
+        with open('/proc/self/stat', encoding='ascii') as f:
+            # starttime, in clock ticks since boot, is field 22 (the 20th after "(comm)")
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', encoding='ascii') as f:
+            uptime = float(f.read().split()[0])
+        return time.perf_counter() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.perf_counter()
+
+
+PROCESS_START = _process_start()
+
+# phase -> seconds it took; milestone -> seconds after process start
+_startup_phases = {}
+_startup_milestones = {}
+
+
+def histogram(stage):
+    """Histogram for a stage name, created on first use"""
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, Histogram())
+    return hist
+
+
+def timed(stage):
+    """Decorator recording each call's duration under stage"""
+    def decorator(fn):
+        hist = histogram(stage)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage_timer(stage):
+    """Context-manager form of timed()"""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def startup_phase(phase):
+    """Record how long a one-off startup step takes (the last run wins)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _startup_phases[phase] = time.perf_counter() - start
+
+
+def mark_startup(milestone):
+    """Record the time since process start at which milestone is first reached"""
+    if milestone not in _startup_milestones:
+        _startup_milestones.setdefault(milestone, time.perf_counter() - PROCESS_START)
+
+
+def startup_report():
+    """{'phases': {phase: seconds}, 'milestones': {milestone: seconds since start}}"""
+    return {'phases': dict(_startup_phases), 'milestones': dict(_startup_milestones)}
+
+
+def render_startup():
+    """Startup phases and milestones as Prometheus gauges"""
+    lines = ["# HELP chatbot_startup_phase_seconds Time taken by each startup step.",
+             "# TYPE chatbot_startup_phase_seconds gauge"]
+    lines.extend(f'chatbot_startup_phase_seconds{{phase="{phase}"}} {seconds}'
+                 for phase, seconds in sorted(_startup_phases.items()))
+    lines += ["# HELP chatbot_startup_seconds Time from process start to each startup milestone.",
+              "# TYPE chatbot_startup_seconds gauge"]
+    lines.extend(f'chatbot_startup_seconds{{milestone="{milestone}"}} {seconds}'
+                 for milestone, seconds in sorted(_startup_milestones.items()))
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric, hist, labels=''):
+    counts, total, count = hist.snapshot()
+    prefix = f'{labels},' if labels else ''
+    lines = []
+    cumulative = 0
+    for bound, n in zip(hist.buckets, counts):
+        cumulative += n
+        lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {count}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{metric}_sum{suffix} {total}')
+    lines.append(f'{metric}_count{suffix} {count}')
+    return lines
+
+
+def render_histogram(metric, hist, help_text):
+    """One unlabelled histogram in the Prometheus text exposition format"""
+    lines = [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+    return "\n".join(lines + _histogram_lines(metric, hist)) + "\n"
+
+
+def render_prometheus(metric='chatbot_stage_duration_seconds'):
+    """All stage histograms in the Prometheus text exposition format"""
+    lines = [f"# HELP {metric} Time spent in each chatbot pipeline stage.",
+             f"# TYPE {metric} histogram"]
+    for stage, hist in sorted(_histograms.items()):
+        lines.extend(_histogram_lines(metric, hist, f'stage="{stage}"'))
+    return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    """
+    Statistical profiler for requests slower than a threshold
+
+    A single daemon thread samples the stacks of the threads currently
+    inside profile(). When a profiled block runs for at least threshold_ms,
+    its samples are written as folded stacks ("frame;frame;frame count").
+    """
+
+    def __init__(self, threshold_ms, interval_ms=1.0, output_dir='profiles'):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._dump_ids = itertools.count()
+        # Threads don't survive fork, so the sampler starts per process on first use
+        self._sampler_pid = None
+
+    def _ensure_sampler(self):
+        if self._sampler_pid != os.getpid():
+            self._sampler_pid = os.getpid()
+            threading.Thread(target=self._run, name='slow-request-profiler', daemon=True).start()
+
+    @staticmethod
+    def _fold(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            stacks = {thread_id: self._fold(frames[thread_id]) for thread_id in active if thread_id in frames}
+            with self._lock:
+                for thread_id, stack in stacks.items():
+                    samples = self._active.get(thread_id)
+                    if samples is not None:
+                        samples[stack] = samples.get(stack, 0) + 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, label):
+        thread_id = threading.get_ident()
+        samples = {}
+        with self._lock:
+            self._ensure_sampler()
+            self._active[thread_id] = samples
+            self._wakeup.set()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active.pop(thread_id, None)
+            if elapsed >= self.threshold and samples:
+                self._dump(label, elapsed, samples)
+
+    def _dump(self, label, elapsed, samples):
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._dump_ids)}-{label}-{elapsed * 1000:.0f}ms.folded"
+        with open(os.path.join(self.output_dir, name), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+_profiler = None
+
+
+def slow_request_profiler():
+    """Process-wide profiler if CHAT_PROFILE_SLOW_MS is set, else None"""
+    global _profiler
+    threshold = os.environ.get('CHAT_PROFILE_SLOW_MS')
+    if threshold and _profiler is None:
+        with _histograms_lock:
+            if _profiler is None:
+                _profiler = SlowRequestProfiler(float(threshold),
+                                                float(os.environ.get('CHAT_PROFILE_INTERVAL_MS', 1.0)),
+                                                os.environ.get('CHAT_PROFILE_DIR', 'profiles'))
+    return _profiler
@@ -0,0 +1,120 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Metric Metadata Registry
+Client: Global Finance Corp (GFC)
+
+Everything the chatbot says about a metric comes from METRIC_TABLE: its
+display name, its unit (and so its formatter) and the one-line context
+shown after a lookup. Supporting a new metric in responses means adding a
+row here, not another branch in every handler.
+
+Metrics without a row (columns of a custom CSV, for example) get a
+default entry: the title-cased key as label, shown as a plain number,
+with no context line.
+"""
+
+from dataclasses import dataclass, field
+
+# metric -> optional 'label', 'unit' (a UNIT_FORMATS key) and 'context'
+# ({company} and {value}, the formatted value, are filled in)
+METRIC_TABLE = {
+    'revenue': {
+        'unit': 'currency',
+        'context': "This represents the total revenue generated during the fiscal year.",
+    },
+    'net_income': {
+        'unit': 'currency',
+        'context': "This is the company's bottom-line profit after all expenses.",
+    },
+    'profit_margin': {
+        'unit': 'percent',
+        'context': "{company} keeps {value} of every dollar as profit.",
+    },
+    'cash_flow': {
+        'unit': 'currency',
+        'context': "This shows cash generated from core business operations.",
+    },
+    'roe': {
+        'unit': 'percent',
+        'context': "ROE measures how efficiently the company generates profits from equity.",
+    },
+    'assets': {
+        'unit': 'currency',
+    },
+    'liabilities': {
+        'unit': 'currency',
+    },
+    'equity': {
+        'unit': 'currency',
+        'context': "Equity is what remains of the assets after all liabilities.",
+    },
+    'roa': {
+        'label': 'ROA',
+        'unit': 'percent',
+        'context': "ROA measures how much profit the company earns on its assets.",
+    },
+    'debt_to_assets': {
+        'label': 'Debt to Assets',
+        'unit': 'ratio',
+        'context': "The share of {company}'s assets financed by liabilities.",
+    },
+    'revenue_growth': {
+        'unit': 'percent',
+    },
+    'net_income_growth': {
+        'unit': 'percent',
+    },
+    'assets_growth': {
+        'unit': 'percent',
+    },
+    'cash_flow_growth': {
+        'unit': 'percent',
+    },
+}
+
+# Values are in millions of dollars, in percent, plain ratios or unitless
+UNIT_FORMATS = {
+    'currency': '${:,.0f}M'.format,
+    'percent': '{:.1f}%'.format,
+    'ratio': '{:.2f}'.format,
+    'number': '{:,.2f}'.format,
+}
+
+
+@dataclass(frozen=True)
+class MetricInfo:
+    """
+    Display metadata for one metric
+
+    name is for running text ("net income"), label for headings and chart
+    axes ("Net Income"); format(value) renders a value in the metric's unit.
+    """
+    key: str
+    name: str
+    label: str
+    unit: str
+    format: callable = field(repr=False, compare=False)
+    context: str = None
+
+    @classmethod
+    def from_row(cls, key, row):
+        name = key.replace('_', ' ')
+        unit = row.get('unit', 'number')
+        return cls(key, name, row.get('label', name.title()), unit, UNIT_FORMATS[unit], row.get('context'))
+
+    def explain(self, company, formatted):
+        """Context line for a looked-up value, or None"""
+        if self.context is None:
+            return None
+        return self.context.format(company=company, value=formatted)
+
+
+_REGISTRY = {key: MetricInfo.from_row(key, row) for key, row in METRIC_TABLE.items()}
+
+
+def metric_info(metric):
+    """MetricInfo for a metric key (a default entry if it has no METRIC_TABLE row)"""
+    info = _REGISTRY.get(metric)
+    if info is None:
+        info = _REGISTRY[metric] = MetricInfo.from_row(metric, {})
+    return info
@@ -0,0 +1,113 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Request-Coalescing Micro-Batcher
+Client: Global Finance Corp (GFC)
+
+Concurrent requests that each need the spaCy model would otherwise run
+nlp(query) one by one on their own threads and contend for the GIL. A
+MicroBatcher queues those single calls, and one worker thread drains the
+queue: it waits at most window_ms after the first queued item (or until
+max_batch items are waiting), runs the whole batch through one batched
+call such as nlp.pipe, and hands each caller its own result.
+
+Queue depth, batch sizes and queue wait times are kept for /metrics.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from instrumentation import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submit(item) calls into process_batch(items) calls
+
+    process_batch receives a list and must return one result per item, in
+    order. An exception raised by process_batch is re-raised in every
+    caller of that batch.
+    """
+
+    def __init__(self, process_batch, window_ms=3.0, max_batch=32, name='micro-batcher'):
+        self.process_batch = process_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram()
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # Threads don't survive fork, so the worker starts per process on first use
+        self._worker_pid = None
+
+    def _ensure_worker(self):
+        if self._worker_pid != os.getpid():
+            with self._lock:
+                if self._worker_pid != os.getpid():
+                    self._worker_pid = os.getpid()
+                    threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def submit(self, item):
+        """Queue one item and block until its batch has run; returns its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        for _, _, queued in batch:
+            self.queue_wait.observe(started - queued)
+        self.batch_sizes.observe(len(batch))
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+
+        try:
+            results = list(self.process_batch([item for item, _, _ in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: got {len(results)} results for {len(batch)} items")
+        except Exception as exc:
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            batches, items = self.batches, self.items
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+        }
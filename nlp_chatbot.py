@@ -8,51 +8,32 @@ This enhanced version uses Natural Language Processing to understand
 query variations, handle typos, and extract entities intelligently.
 """
 
-import spacy
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-import re
+import threading
 
-# Load spaCy NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    print("⚠️  spaCy model not found. Run: python -m spacy download en_core_web_sm")
-    exit()
+from company_resolver import CompanyResolver
+from financial_store import DEFAULT_DATA_PATH, load_store, refresh_store
+from instrumentation import timed
+from metric_registry import metric_info
+from micro_batcher import MicroBatcher
+from nlp_pipeline import ModelUnavailable, get_nlp, load_in_background, may_contain_org
+from query_parser import QueryParser
+from query_plan import QueryPlan
+from semantic_index import DEFAULT_INDEX_DIR, DEFAULT_TEMPLATES_PATH, load_index
+from Task2_Financial_Chatbot.canned_answers import DEFAULT_CANNED_PATH, CannedAnswers
+from vocabulary_matcher import VocabularyMatcher, tokenize
+
+MEDALS = ('🥇', '🥈', '🥉')
 
 class NLPFinancialChatbot:
     """
     Enhanced chatbot with Natural Language Processing capabilities
     """
     
-    def __init__(self):
-        # Financial data from Task 1
-        self.financial_data = {
-            'Microsoft': {
-                '2024': {'revenue': 245122, 'net_income': 88136, 'profit_margin': 36.0, 
-                        'cash_flow': 118000, 'roe': 52.8, 'assets': 512163},
-                '2023': {'revenue': 211915, 'net_income': 72361, 'profit_margin': 34.2,
-                        'cash_flow': 87582, 'roe': 45.2, 'assets': 411976},
-                '2022': {'revenue': 198270, 'net_income': 72738, 'profit_margin': 36.7,
-                        'cash_flow': 89035, 'roe': 43.6, 'assets': 364840}
-            },
-            'Tesla': {
-                '2024': {'revenue': 97690, 'net_income': 7091, 'profit_margin': 7.3,
-                        'cash_flow': 14900, 'roe': 9.6, 'assets': 122070},
-                '2023': {'revenue': 96773, 'net_income': 14997, 'profit_margin': 15.5,
-                        'cash_flow': 13256, 'roe': 23.6, 'assets': 106618},
-                '2022': {'revenue': 81462, 'net_income': 12556, 'profit_margin': 15.4,
-                        'cash_flow': 14724, 'roe': 27.4, 'assets': 82338}
-            },
-            'Apple': {
-                '2024': {'revenue': 391035, 'net_income': 93736, 'profit_margin': 24.0,
-                        'cash_flow': 118254, 'roe': 164.6, 'assets': 364980},
-                '2023': {'revenue': 383285, 'net_income': 96995, 'profit_margin': 25.3,
-                        'cash_flow': 110543, 'roe': 171.7, 'assets': 352583},
-                '2022': {'revenue': 394328, 'net_income': 99803, 'profit_margin': 25.3,
-                        'cash_flow': 122151, 'roe': 196.1, 'assets': 352755}
-            }
-        }
+    def __init__(self, data_path=None):
+        # Financial data from Task 1 (memory-mapped snapshot of the processed CSV)
+        self.data_path = data_path or DEFAULT_DATA_PATH
+        self.store = load_store(self.data_path)
+        self._reload_lock = threading.Lock()
         
         # Company name mappings (includes abbreviations and variations)
         self.company_mappings = {
@@ -82,66 +63,130 @@ class NLPFinancialChatbot:
             'trend': ['trend', 'change', 'growth', 'over time', 'historical'],
             'ranking': ['best', 'highest', 'lowest', 'top', 'worst', 'which', 'who']
         }
-    
-    def extract_company(self, query):
-        """Extract company name using NLP and fuzzy matching"""
-        query_lower = query.lower()
         
-        # First try direct mapping
+        # Specific intents win over the generic question words of get_metric
+        self.intent_priority = ['compare', 'trend', 'ranking', 'get_metric']
+        
+        # All three vocabularies compiled into one single-pass matcher
+        self.matcher = VocabularyMatcher()
         for abbr, full_name in self.company_mappings.items():
-            if abbr in query_lower:
-                return full_name
-        
-        # Use spaCy for entity recognition
-        doc = nlp(query)
-        for ent in doc.ents:
-            if ent.label_ == "ORG":
-                company_match = process.extractOne(ent.text.lower(), 
-                                                   self.company_mappings.keys())
-                if company_match and company_match[1] > 70:
-                    return self.company_mappings[company_match[0]]
+            self.matcher.add('company', abbr, full_name)
+        self.matcher.add_vocabulary('metric', self.metric_synonyms)
+        self.matcher.add_vocabulary('intent', self.intent_patterns)
         
-        # Fuzzy match against company names
-        for company in ['Microsoft', 'Tesla', 'Apple']:
-            if fuzz.partial_ratio(company.lower(), query_lower) > 80:
-                return company
+        # Trigram-indexed fuzzy resolver for typos and NER spans
+        self.resolver = CompanyResolver(self.company_mappings)
+        
+        # Vocabulary words that never name a company (NER pre-filter)
+        self.known_words = {word for phrases in [*self.metric_synonyms.values(), *self.intent_patterns.values()]
+                            for phrase in phrases for word in phrase.split()}
         
-        return None
+        # Single-pass parser over the same vocabularies
+        self.parser = QueryParser(self.matcher, self.intent_priority, self.store.years[-1],
+                                  company_fallback=self.resolve_company_fallback)
+        self._last_parse = (None, None)
+        
+        # Set by enable_ner_batching() when requests run on many threads
+        self.ner_batcher = None
+        
+        # Canned Q&A table consulted before parsing (see enable_canned_answers)
+        self.canned = None
+        
+        # Paraphrase templates and company aliases (see enable_semantic_fallback)
+        self.semantic = None
     
-    def extract_year(self, query):
-        """Extract year from query"""
-        # Look for 4-digit years
-        years = re.findall(r'20(22|23|24)', query)
-        if years:
-            return '20' + years[0]
+    def enable_ner_batching(self, window_ms=3.0, max_batch=32):
+        """Coalesce concurrent NER calls into shared nlp.pipe batches (threaded servers)"""
+        self.ner_batcher = MicroBatcher(lambda texts: get_nlp().pipe(texts, batch_size=max_batch),
+                                        window_ms=window_ms, max_batch=max_batch, name='ner-batcher')
+        return self.ner_batcher
+    
+    def enable_canned_answers(self, path=DEFAULT_CANNED_PATH):
+        """Answer questions found in a canned Q&A file straight from the table, without parsing"""
+        self.canned = CannedAnswers.load(path)
+        return self.canned
+    
+    def enable_semantic_fallback(self, templates_path=DEFAULT_TEMPLATES_PATH, index_dir=DEFAULT_INDEX_DIR):
+        """Fill slots the keyword vocabularies miss from the nearest paraphrase template or company alias"""
+        self.semantic = load_index(templates_path, index_dir)
+        self.parser.semantic = self.semantic
+        self._last_parse = (None, None)
+        return self.semantic
+    
+    def canned_answer(self, query):
+        """The canned answer for query, or None (also None when no table is loaded)"""
+        return self.canned.lookup(query) if self.canned is not None else None
+    
+    def reload_data(self):
+        """Apply edits to the financial data CSV; the new store replaces the old one in a single swap
         
-        # Keywords for latest year
-        if any(word in query.lower() for word in ['latest', 'current', 'recent', 'now', 'today']):
-            return '2024'
+        Returns the companies whose data changed (None when everything was rebuilt).
+        Requests already running keep reading the store they started with.
+        """
+        with self._reload_lock:
+            store, changed = refresh_store(self.store, self.data_path)
+            if store is not self.store:
+                self.parser.default_year = str(store.years[-1])
+                self.store = store
+                self._last_parse = (None, None)
+        return changed
+    
+    @timed('parse_query')
+    def parse(self, query, doc=None):
+        """Parse a query in one pass into a ParsedQuery (remembers the last query)
         
-        return '2024'  # Default to latest
+        A doc already produced by nlp.pipe can be passed in to skip the model.
+        """
+        last_query, parsed = self._last_parse
+        if last_query != query:
+            parsed = self.parser.parse(query, doc)
+            self._last_parse = (query, parsed)
+        return parsed
     
-    def extract_metric(self, query):
-        """Extract financial metric using synonym matching"""
-        query_lower = query.lower()
+    def match_company_mapping(self, query):
+        """Direct abbreviation/name lookup"""
+        companies = self.matcher.find_all(query)['company']
+        return companies[0].value if companies else None
+    
+    def needs_ner(self, query):
+        """True when extract_company would have to run the spaCy model"""
+        return (self.match_company_mapping(query) is None
+                and may_contain_org(query, self.known_words)
+                and (self.semantic is None or self.semantic.match_alias(tokenize(query)) is None))
+    
+    def resolve_company_fallback(self, query, doc=None):
+        """NER then fuzzy company lookup for queries without a known alias
         
-        for metric, synonyms in self.metric_synonyms.items():
-            for synonym in synonyms:
-                if synonym in query_lower:
-                    return metric
+        Returns (company, score 0-100) or None.
+        """
+        # Use spaCy for entity recognition, only if an org name is possible
+        if doc is None and may_contain_org(query, self.known_words):
+            doc = self.ner_batcher.submit(query) if self.ner_batcher else get_nlp()(query)
+        if doc is not None:
+            for ent in doc.ents:
+                if ent.label_ == "ORG":
+                    company_match = self.resolver.resolve(ent.text, score_cutoff=70)
+                    if company_match:
+                        return company_match
         
-        return None
+        # Fuzzy match against company names
+        return self.resolver.search(query, score_cutoff=80)
+    
+    def extract_company(self, query, doc=None):
+        """Extract company name using NLP and fuzzy matching"""
+        return self.parse(query, doc).company
+    
+    def extract_year(self, query):
+        """Extract year from query (end of a range; defaults to the latest year)"""
+        return self.parse(query).year
+    
+    def extract_metric(self, query):
+        """Extract financial metric using synonym matching"""
+        return self.parse(query).metric
     
     def detect_intent(self, query):
         """Detect user intent using keyword matching"""
-        query_lower = query.lower()
-        
-        for intent, keywords in self.intent_patterns.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    return intent
-        
-        return 'get_metric'  # Default intent
+        return self.parse(query).intent
     
     def format_currency(self, amount):
         """Format currency values"""
@@ -151,102 +196,126 @@ class NLPFinancialChatbot:
         """Format percentage values"""
         return f"{value:.1f}%"
     
+    def format_metric(self, metric, value):
+        """Format a value in the metric's unit (currency or percentage)"""
+        return metric_info(metric).format(value)
+    
+    def format_filters(self, filters):
+        """Readable filter list, e.g. "Profit Margin > 20.0%" """
+        return ", ".join(f"{metric_info(metric).label} {op} {self.format_metric(metric, value)}"
+                         for metric, op, value in filters)
+    
+    def year_coverage(self):
+        """Loaded fiscal years as text, e.g. "2022-2024" """
+        years = self.store.years
+        if len(years) > 1 and years[-1] - years[0] == len(years) - 1:
+            return f"{years[0]}-{years[-1]}"
+        return ", ".join(str(year) for year in years)
+    
+    def no_data_message(self, metric, company=None, year=None, start_year=None, end_year=None):
+        """
+        Reply for a lookup that found nothing
+        
+        When the requested year (or start_year..end_year range) lies outside
+        the loaded data, it asks for a year that is loaded instead.
+        """
+        span = year or "-".join(str(y) for y in (start_year, end_year) if y is not None)
+        if company:
+            scope = f" for {company} in {span}" if span else f" for {company}"
+        else:
+            scope = f" for {span}" if span else ""
+        text = f"Sorry, I don't have {metric_info(metric).name} data{scope}."
+        if year is not None:
+            outside = int(year) not in self.store.year_index
+        else:
+            lo = int(start_year) if start_year is not None else float('-inf')
+            hi = int(end_year) if end_year is not None else float('inf')
+            outside = not any(lo <= y <= hi for y in self.store.years)
+        if outside and self.store.years:
+            text += f" My data covers {self.year_coverage()}: which of those years would you like?"
+        return text
+    
     def get_metric_value(self, company, year, metric):
         """Get specific metric value"""
-        try:
-            return self.financial_data[company][year][metric]
-        except KeyError:
-            return None
+        return self.store.get(company, year, metric)
     
     def handle_get_metric(self, company, year, metric):
         """Handle queries asking for specific metric"""
         value = self.get_metric_value(company, year, metric)
         
         if value is None:
-            return f"Sorry, I don't have {metric} data for {company} in {year}."
+            return self.no_data_message(metric, company, year)
         
-        # Format based on metric type
-        if metric in ['revenue', 'net_income', 'cash_flow', 'assets']:
-            formatted_value = self.format_currency(value)
-        else:
-            formatted_value = self.format_percentage(value)
-        
-        response = f"📊 **{company}'s {metric.replace('_', ' ').title()} in {year}:**\n"
-        response += f"   {formatted_value}\n\n"
+        info = metric_info(metric)
+        formatted_value = info.format(value)
+        response = f"📊 **{company}'s {info.label} in {year}:**\n   {formatted_value}\n\n"
         
         # Add context
-        if metric == 'revenue':
-            response += "💡 This represents the total revenue generated during the fiscal year."
-        elif metric == 'net_income':
-            response += "💡 This is the company's bottom-line profit after all expenses."
-        elif metric == 'profit_margin':
-            response += f"💡 {company} keeps {formatted_value} of every dollar as profit."
-        elif metric == 'cash_flow':
-            response += "💡 This shows cash generated from core business operations."
-        elif metric == 'roe':
-            response += "💡 ROE measures how efficiently the company generates profits from equity."
-        
-        return response
+        context = info.explain(company, formatted_value)
+        return response + "💡 " + context if context else response
     
-    def handle_compare(self, metric, year='2024'):
-        """Handle comparison queries"""
+    def handle_compare(self, metric, year='2024', plan=None):
+        """Handle comparison queries (every company, or the selection a plan describes)"""
+        if plan is None:
+            plan = QueryPlan((metric,) if metric else (), year)
+        metric, year = plan.sort_metric, plan.year
         if not metric:
             return "Please specify which metric you'd like to compare (e.g., revenue, profit margin)."
         
-        response = f"📊 **{metric.replace('_', ' ').title()} Comparison ({year}):**\n\n"
-        
-        companies_data = []
-        for company in ['Microsoft', 'Tesla', 'Apple']:
-            value = self.get_metric_value(company, year, metric)
-            if value:
-                companies_data.append((company, value))
+        # Filtered, sorted and limited on the store's columns
+        result = plan.execute(self.store)
+        if not len(result):
+            if plan.filters:
+                return f"No companies match {self.format_filters(plan.filters)} in {year}."
+            return self.no_data_message(metric, year=year)
+        companies_data = result.pairs()
+        info = metric_info(metric)
+        extra = [(metric_info(m), result.column(m)) for m in plan.metrics[1:]]
         
-        # Sort by value
-        companies_data.sort(key=lambda x: x[1], reverse=True)
+        scope = f"{year}, {self.format_filters(plan.filters)}" if plan.filters else year
+        parts = [f"📊 **{info.label} Comparison ({scope}):**\n\n"]
         
         # Display with medals
-        medals = ['🥇', '🥈', '🥉']
         for i, (company, value) in enumerate(companies_data):
-            medal = medals[i] if i < 3 else '  '
-            if metric in ['revenue', 'net_income', 'cash_flow', 'assets']:
-                formatted = self.format_currency(value)
-            else:
-                formatted = self.format_percentage(value)
-            response += f"{medal} **{company}**: {formatted}\n"
+            medal = MEDALS[i] if i < 3 else '  '
+            parts.append(f"{medal} **{company}**: {info.format(value)}")
+            for other, values in extra:
+                shown = 'n/a' if values[i] is None else other.format(values[i])
+                parts.append(f" | {other.label}: {shown}")
+            parts.append("\n")
         
         winner = companies_data[0][0]
-        response += f"\n💡 **{winner}** leads in {metric.replace('_', ' ')} for {year}."
-        
-        return response
+        if plan.ascending:
+            parts.append(f"\n💡 **{winner}** has the lowest {info.name} for {year}.")
+        else:
+            parts.append(f"\n💡 **{winner}** leads in {info.name} for {year}.")
+        return "".join(parts)
     
-    def handle_trend(self, company, metric):
-        """Handle trend analysis queries"""
+    def handle_trend(self, company, metric, start_year=None, end_year=None):
+        """Handle trend analysis queries (all loaded years unless a range is given)"""
         if not company or not metric:
             return "Please specify both a company and metric for trend analysis."
         
-        response = f"📈 **{company}'s {metric.replace('_', ' ').title()} Trend (2022-2024):**\n\n"
-        
-        for year in ['2022', '2023', '2024']:
-            value = self.get_metric_value(company, year, metric)
-            if value:
-                if metric in ['revenue', 'net_income', 'cash_flow', 'assets']:
-                    formatted = self.format_currency(value)
-                else:
-                    formatted = self.format_percentage(value)
-                response += f"- **{year}**: {formatted}\n"
+        # Whole (company, metric) slice across the requested years
+        series = self.store.series(company, metric, start_year, end_year)
+        if not series:
+            return self.no_data_message(metric, company, start_year=start_year, end_year=end_year)
+        first_year, last_year = series[0][0], series[-1][0]
         
-        # Calculate change
-        start_val = self.get_metric_value(company, '2022', metric)
-        end_val = self.get_metric_value(company, '2024', metric)
+        info = metric_info(metric)
+        parts = [f"📈 **{company}'s {info.label} Trend ({first_year}-{last_year}):**\n\n"]
+        parts.extend([f"- **{year}**: {info.format(value)}\n" for year, value in series if value])
         
-        if start_val and end_val:
-            change_pct = ((end_val - start_val) / start_val) * 100
+        # Full-span change was precomputed when the data was loaded
+        trend = self.store.trend(company, metric, start_year, end_year)
+        if trend:
+            _, _, change_pct = trend
             if change_pct > 0:
-                response += f"\n📈 **Growth**: {change_pct:.1f}% increase from 2022 to 2024"
+                parts.append(f"\n📈 **Growth**: {change_pct:.1f}% increase from {first_year} to {last_year}")
             else:
-                response += f"\n📉 **Decline**: {abs(change_pct):.1f}% decrease from 2022 to 2024"
+                parts.append(f"\n📉 **Decline**: {abs(change_pct):.1f}% decrease from {first_year} to {last_year}")
         
-        return response
+        return "".join(parts)
     
     def handle_ranking(self, metric, year='2024'):
         """Handle ranking queries (best/worst)"""
@@ -255,19 +324,25 @@ class NLPFinancialChatbot:
     def process_query(self, query):
         """Main query processing with NLP"""
         
-        # Detect intent
-        intent = self.detect_intent(query)
+        # Prepared questions are answered without touching spaCy
+        answer = self.canned_answer(query)
+        if answer is not None:
+            return answer
         
-        # Extract entities
-        company = self.extract_company(query)
-        year = self.extract_year(query)
-        metric = self.extract_metric(query)
-        
-        # Route to appropriate handler
-        if intent == 'compare' or intent == 'ranking':
-            return self.handle_compare(metric, year)
-        elif intent == 'trend':
+        # Intent and entities in a single pass
+        return self.render(self.parse(query))
+    
+    @timed('render')
+    def render(self, parsed):
+        """Route an already parsed query to its text handler"""
+        intent, company, year, metric = parsed.intent, parsed.company, parsed.year, parsed.metric
+        if intent == 'trend':
+            if parsed.is_range:
+                return self.handle_trend(company, metric, parsed.year_start, parsed.year_end)
             return self.handle_trend(company, metric)
+        elif parsed.is_screen:
+            # Several companies/metrics, filters or top-N: one vectorised plan
+            return self.handle_compare(metric, year, QueryPlan.from_parsed(parsed))
         elif intent == 'get_metric':
             if company and metric:
                 return self.handle_get_metric(company, year, metric)
@@ -288,6 +363,11 @@ class NLPFinancialChatbot:
 **Comparisons:**
 - "Compare profit margins"
 - "Which company has the best revenue?"
+- "Compare Apple and Tesla ROE and margin"
+
+**Screening:**
+- "Top 10 companies by ROE in 2023 with margin above 20%"
+- "Lowest profit margin in 2023"
 
 **Trends:**
 - "Show Apple's revenue trend"
@@ -322,8 +402,11 @@ def main():
     print("\nType 'help' for more examples or 'exit' to quit")
     print("-" * 80)
     
-    # Initialize NLP chatbot
+    # Initialize NLP chatbot; spaCy loads while the user types
     chatbot = NLPFinancialChatbot()
+    chatbot.enable_canned_answers()
+    chatbot.enable_semantic_fallback()
+    load_in_background()
     
     # Main loop
     while True:
@@ -343,7 +426,10 @@ def main():
             response = chatbot.provide_help()
         else:
             # Process query with NLP
-            response = chatbot.process_query(user_input)
+            try:
+                response = chatbot.process_query(user_input)
+            except ModelUnavailable as exc:
+                raise SystemExit(f"⚠️  {exc}") from None
         
         # Display response
         print("\n🤖 Chatbot Response:")
@@ -0,0 +1,174 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Shared spaCy Pipeline
+Client: Global Finance Corp (GFC)
+
+The chatbot only reads doc.ents, so the model is loaded lazily, once per
+process, with everything except the NER component excluded. Every
+NLPFinancialChatbot / ChatbotJSONAdapter instance shares that one model.
+
+Importing spaCy takes about a second and building the pipeline from the
+installed package about half a second more. With CHAT_NLP_SNAPSHOT set to
+a directory, the loaded pipeline is pickled there once and later processes
+restore it from the pickle, skipping config resolution and model
+construction. Snapshots are keyed by the spaCy, model and Python versions
+and rebuilt when any of them changes. They are pickles, so only point
+CHAT_NLP_SNAPSHOT at a directory that this service alone writes to.
+"""
+
+import json
+import os
+import pickle
+import platform
+import re
+import threading
+
+from instrumentation import startup_phase
+
+MODEL_NAME = "en_core_web_sm"
+
+# Directory for the pickled pipeline; off when unset
+SNAPSHOT_DIR = os.environ.get('CHAT_NLP_SNAPSHOT')
+
+SNAPSHOT_VERSION = 1
+
+# en_core_web_sm's NER has its own embedding layer, so the shared tok2vec
+# and every tagging/parsing component can be left out entirely
+EXCLUDED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+# Words that start a question or sentence; capitalised, they are not org names
+COMMON_WORDS = {
+    'a', 'an', 'and', 'are', 'at', 'by', 'can', 'compare', 'could', 'did', 'do', 'does',
+    'for', 'from', 'get', 'give', 'has', 'have', 'hi', 'hello', 'how', 'i', 'in', 'is',
+    'it', 'its', 'me', 'much', 'of', 'on', 'over', 'please', 'show', 'tell', 'than',
+    'the', 'their', 'to', 'vs', 'was', 'were', 'what', "what's", 'when', 'which',
+    'who', 'why', 'with', 'year',
+}
+
+_CAPITALISED = re.compile(r"\b[A-Z][\w&'.-]*")
+
+_nlp = None
+_lock = threading.Lock()
+
+
+class ModelUnavailable(RuntimeError):
+    """The spaCy model is not installed"""
+
+
+def _snapshot_key(spacy):
+    return {
+        'version': SNAPSHOT_VERSION,
+        'model': MODEL_NAME,
+        'model_version': spacy.util.get_package_version(MODEL_NAME),
+        'spacy': spacy.__version__,
+        'python': platform.python_version(),
+        'excluded': EXCLUDED_COMPONENTS,
+    }
+
+
+def _snapshot_paths(directory):
+    return os.path.join(directory, f'{MODEL_NAME}.json'), os.path.join(directory, f'{MODEL_NAME}.pkl')
+
+
+def restore_snapshot(directory, key):
+    """The pipeline pickled in directory under key, or None if there is none (or it is stale)"""
+    manifest_path, pickle_path = _snapshot_paths(directory)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            if json.load(f) != key:
+                return None
+    except (OSError, ValueError):
+        return None
+    try:
+        with open(pickle_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        # Truncated or otherwise unreadable: rebuilt from the model
+        return None
+
+
+def save_snapshot(nlp, directory, key):
+    """Pickle nlp into directory; a concurrent reader sees the old snapshot or the new one"""
+    os.makedirs(directory, exist_ok=True)
+    manifest_path, pickle_path = _snapshot_paths(directory)
+    # Pickle before manifest, so a manifest never vouches for a pickle written under another key
+    tmp = f'{pickle_path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(nlp, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, pickle_path)
+    tmp = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(key, f)
+    os.replace(tmp, manifest_path)
+
+
+def _load(snapshot_dir):
+    import spacy
+
+    key = _snapshot_key(spacy) if snapshot_dir else None
+    if snapshot_dir:
+        with startup_phase('nlp_restore'):
+            nlp = restore_snapshot(snapshot_dir, key)
+        if nlp is not None:
+            return nlp
+
+    with startup_phase('nlp_load'):
+        try:
+            nlp = spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+        except OSError:
+            raise ModelUnavailable(f"spaCy model not found. Run: python -m spacy download {MODEL_NAME}") from None
+    if snapshot_dir:
+        try:
+            save_snapshot(nlp, snapshot_dir, key)
+        except OSError as exc:
+            print(f"⚠️  Could not write the spaCy snapshot: {exc}")
+    return nlp
+
+
+def get_nlp():
+    """Return the process-wide NER pipeline, loading it on first use"""
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = _load(SNAPSHOT_DIR)
+    return _nlp
+
+
+def _load_quietly():
+    try:
+        get_nlp()
+    except ModelUnavailable as exc:
+        print(f"⚠️  {exc}")
+
+
+def load_in_background():
+    """
+    Start loading the model on a daemon thread; get_nlp() callers wait for it
+
+    Call it after any fork: a child forked mid-load would inherit the held lock.
+    """
+    if _nlp is None:
+        threading.Thread(target=_load_quietly, name='nlp-loader', daemon=True).start()
+
+
+def is_loaded():
+    """True once the model has been loaded in this process"""
+    return _nlp is not None
+
+
+def may_contain_org(text, known_words=()):
+    """
+    Cheap pre-filter before NER.
+
+    The small English model only tags ORG spans that contain a capitalised
+    token, so a query with no capitalised word outside the common/known
+    vocabulary is never worth a model pass.
+    """
+    for match in _CAPITALISED.finditer(text):
+        word = match.group().lower().rstrip(".'")
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word not in COMMON_WORDS and word not in known_words:
+            return True
+    return False
@@ -1,9 +1,11 @@
 import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import { Send, Bot, User, Sparkles } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import Graph from './Graph';
 
+// Answers kept for 304 replays; the least recently asked one goes first
+const MAX_CACHED_ANSWERS = 50;
+
 export default function ChatInterface() {
     const [messages, setMessages] = useState([
         {
@@ -15,33 +17,90 @@ export default function ChatInterface() {
     const [input, setInput] = useState('');
     const [loading, setLoading] = useState(false);
     const scrollRef = useRef(null);
+    // Last streamed events per query with their ETag, replayed when the server answers 304
+    const answers = useRef(new Map());
 
     useEffect(() => {
         scrollRef.current?.scrollIntoView({ behavior: 'smooth' });
     }, [messages]);
 
+    const updateMessage = (id, update) => {
+        setMessages(prev => prev.map(msg => (msg.id === id ? { ...msg, ...update(msg) } : msg)));
+    };
+
+    // /chat/stream sends newline-delimited JSON: parsed query, text, chart points in chunks, done
+    const handleEvent = (id, event) => {
+        if (event.type === 'text') {
+            const viz = event.visualization ? { ...event.visualization, data: [] } : null;
+            setMessages(prev => [...prev, { id, role: 'bot', text: event.text, viz }]);
+            setLoading(false);
+        } else if (event.type === 'data') {
+            updateMessage(id, msg => ({
+                viz: msg.viz ? { ...msg.viz, data: [...msg.viz.data, ...event.points] } : msg.viz
+            }));
+        }
+    };
+
     const sendMessage = async () => {
-        if (!input.trim()) return;
+        if (!input.trim() || loading) return;
 
         const userMsg = { role: 'user', text: input };
+        const botId = Date.now();
         setMessages(prev => [...prev, userMsg]);
         setInput('');
         setLoading(true);
 
+        const query = input;
+        const cached = answers.current.get(query);
+        if (cached) {
+            // Re-insert so the Map's insertion order tracks recency
+            answers.current.delete(query);
+            answers.current.set(query, cached);
+        }
         try {
-            const res = await axios.post('/chat', { query: input });
-            const botMsg = {
-                role: 'bot',
-                text: res.data.text,
-                viz: res.data.visualization ? {
-                    type: res.data.visualization.type,
-                    title: res.data.visualization.title,
-                    data: res.data.visualization.data
-                } : null
-            };
-            setMessages(prev => [...prev, botMsg]);
+            const headers = { 'Content-Type': 'application/json' };
+            if (cached) headers['If-None-Match'] = cached.etag;
+            const res = await fetch('/chat/stream', {
+                method: 'POST',
+                headers,
+                body: JSON.stringify({ query })
+            });
+            if (res.status === 304 && cached) {
+                cached.events.forEach(event => handleEvent(botId, event));
+                setLoading(false);
+                return;
+            }
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            const etag = res.headers.get('ETag');
+            const events = [];
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            for (;;) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => {
+                    const event = JSON.parse(line);
+                    events.push(event);
+                    handleEvent(botId, event);
+                });
+            }
+            if (etag) {
+                answers.current.delete(query);
+                answers.current.set(query, { etag, events });
+                if (answers.current.size > MAX_CACHED_ANSWERS) {
+                    answers.current.delete(answers.current.keys().next().value);
+                }
+            }
         } catch (err) {
-            setMessages(prev => [...prev, { role: 'bot', text: "Sorry, I encountered an error connecting to the server." }]);
+            setMessages(prev => [
+                ...prev.filter(msg => msg.id !== botId),
+                { role: 'bot', text: "Sorry, I encountered an error connecting to the server." }
+            ]);
         }
         setLoading(false);
     };
@@ -0,0 +1,284 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Single-Pass Query Parser
+Client: Global Finance Corp (GFC)
+
+Tokenises a query once and fills a ParsedQuery from that one token list:
+the intent, every company and metric mentioned (in query order), a fiscal
+year or year range, and a confidence score. Any four-digit fiscal year is
+recognised ("2019"), as are ranges such as "2019 to 2024",
+"from 2019-2024" and "between 2019 and 2024".
+
+Screening phrases are parsed too: "top 10" / "bottom 5" set a row limit
+and sort direction, and a metric followed by a comparison ("margin above
+20%", "revenue over $100B") becomes a Filter.
+
+With a SemanticIndex attached, descriptive company aliases ("Cupertino")
+are tried before the NER fallback. A query that still lacks a slot its
+intent needs is matched, on the words no vocabulary claimed, against
+paraphrase templates; the nearest one fills an empty metric and, without
+an intent keyword, the intent.
+"""
+
+import re
+import sys
+from collections import namedtuple
+from dataclasses import dataclass, field, fields
+
+from instrumentation import stage_timer
+from vocabulary_matcher import tokenize
+
+# Words that join two years into a range
+RANGE_WORDS = {'to', 'through', 'thru', 'until', 'till', 'and'}
+
+# Words that mean "the latest year we have"
+LATEST_WORDS = {'latest', 'current', 'recent', 'now', 'today'}
+
+# Slots each intent needs before it can be answered
+REQUIRED_SLOTS = {
+    'get_metric': ('company', 'metric'),
+    'compare': ('metric',),
+    'ranking': ('metric',),
+    'trend': ('company', 'metric'),
+}
+
+# Words that put the best rows first / the worst rows first
+TOP_WORDS = {'top', 'best', 'highest', 'largest', 'biggest'}
+BOTTOM_WORDS = {'bottom', 'worst', 'lowest', 'smallest'}
+
+# Comparison phrase -> operator
+COMPARISONS = {
+    'above': '>', 'over': '>', 'greater than': '>', 'more than': '>', 'higher than': '>',
+    'exceeding': '>', '>': '>',
+    'at least': '>=', '>=': '>=',
+    'below': '<', 'under': '<', 'less than': '<', 'lower than': '<', '<': '<',
+    'at most': '<=', '<=': '<=',
+}
+
+# Amounts are stored in millions
+UNIT_SCALE = {'b': 1000, 'bn': 1000, 'billion': 1000, 'm': 1, 'mn': 1, 'million': 1}
+
+# A comparison straight after a metric: " above 20%", " is over $1.5bn"
+_FILTER = re.compile(
+    r"\s*(?:is|was|are|of)?\s*(" + "|".join(sorted(map(re.escape, COMPARISONS), key=len, reverse=True)) + r")"
+    r"\s*(\$)?\s*(-?\d+(?:\.\d+)?)\s*(%|percent\b|billion\b|bn\b|b\b|million\b|mn\b|m\b)?")
+
+Filter = namedtuple('Filter', ['metric', 'op', 'value'])
+
+# Confidence is scaled by this when no intent keyword was present
+DEFAULT_INTENT_PENALTY = 0.8
+
+
+def _as_year(token, min_year, max_year):
+    # Interned, so every parse (and cache key) of a year shares one string
+    if len(token) == 4 and token.isdigit() and min_year <= int(token) <= max_year:
+        return sys.intern(token)
+    return None
+
+
+def _with_slots(cls):
+    """
+    cls rebuilt with __slots__ for its fields (dataclass(slots=True) before
+    Python 3.10): no per-instance __dict__, and pickling that works around
+    the frozen __setattr__
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+
+    def __getstate__(self):
+        return [getattr(self, name) for name in names]
+
+    def __setstate__(self, state):
+        for name, value in zip(names, state):
+            object.__setattr__(self, name, value)
+
+    namespace['__getstate__'] = __getstate__
+    namespace['__setstate__'] = __setstate__
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_with_slots
+@dataclass(frozen=True)
+class ParsedQuery:
+    """
+    Structured result of parsing one query
+
+    Equal parses hash equal (confidence is ignored), so a parse can key the
+    response cache whatever the original wording was. Metrics only used in
+    filters are not repeated in metrics. Slotted: the response cache and the
+    parse cache hold one per entry.
+    """
+    intent: str
+    companies: tuple = ()
+    metrics: tuple = ()
+    year_start: str = None
+    year_end: str = None
+    filters: tuple = ()
+    top: int = None
+    ascending: bool = False
+    confidence: float = field(default=0.0, compare=False)
+
+    @property
+    def company(self):
+        return self.companies[0] if self.companies else None
+
+    @property
+    def metric(self):
+        return self.metrics[0] if self.metrics else None
+
+    @property
+    def year(self):
+        """Single year to answer for (the end of a range)"""
+        return self.year_end
+
+    @property
+    def is_range(self):
+        return self.year_start != self.year_end
+
+    @property
+    def is_screen(self):
+        """True when the answer is a table over companies rather than one value"""
+        return (self.intent in ('compare', 'ranking') or len(self.companies) > 1
+                or len(self.metrics) > 1 or bool(self.filters) or self.top is not None)
+
+
+class QueryParser:
+    """
+    Turns query text into a ParsedQuery in one pass over its tokens
+
+    company_fallback(query, doc) is only called when no company alias
+    matched; it returns (company, score 0-100) or None (NER / fuzzy search).
+    semantic is an optional SemanticIndex for paraphrases.
+    """
+
+    def __init__(self, matcher, intent_priority, default_year, company_fallback=None,
+                 min_year=1900, max_year=2099, semantic=None):
+        self.matcher = matcher
+        self.intent_priority = intent_priority
+        self.default_year = sys.intern(str(default_year))
+        self.company_fallback = company_fallback
+        self.semantic = semantic
+        self.min_year = min_year
+        self.max_year = max_year
+
+    def filters(self, query, metric_matches):
+        """
+        Filters attached to metric matches, and the (start, end) spans they cover
+
+        A bare fiscal year is left to the year parser: "revenue over 2022 to
+        2024" is a range, while "$2022m" or "2022.5" still filter.
+        """
+        text = query.lower()
+        filters, spans = [], []
+        for match in metric_matches:
+            found = _FILTER.match(text, match.end)
+            if found is None:
+                continue
+            op, dollar, number, unit = found.groups()
+            if not dollar and not unit and _as_year(number, self.min_year, self.max_year):
+                continue
+            value = float(number) * UNIT_SCALE.get(unit, 1)
+            filters.append(Filter(match.value, COMPARISONS[op], value))
+            spans.append((match.start, found.end()))
+        return tuple(filters), spans
+
+    def limit(self, tokens):
+        """Row limit and sort direction ("top 10", "5 worst", "lowest")"""
+        top, ascending = None, False
+        for i, (token, _, _) in enumerate(tokens):
+            if token in TOP_WORDS or token in BOTTOM_WORDS:
+                ascending = ascending or token in BOTTOM_WORDS
+                for j in (i + 1, i - 1):
+                    if top is None and 0 <= j < len(tokens) and tokens[j][0].isdigit() and len(tokens[j][0]) < 4:
+                        top = int(tokens[j][0]) or None
+        return top, ascending
+
+    def years(self, query, tokens=None):
+        """(start, end) fiscal years mentioned, or (None, None)"""
+        tokens = tokenize(query) if tokens is None else tokens
+        found = []
+        latest = False
+        for i, (token, start, end) in enumerate(tokens):
+            year = _as_year(token, self.min_year, self.max_year)
+            if year is None:
+                latest = latest or token in LATEST_WORDS
+                continue
+            found.append((i, year))
+
+        if not found:
+            return (self.default_year, self.default_year) if latest else (None, None)
+
+        # A range is two years joined by a range word or a dash
+        for (i, first), (j, second) in zip(found, found[1:]):
+            between = query[tokens[i][2]:tokens[j][1]].strip()
+            joined = j == i + 1 and between in ('-', '–', '')
+            worded = j == i + 2 and tokens[i + 1][0] in RANGE_WORDS
+            if joined or worded:
+                return tuple(sorted((first, second)))
+
+        return found[0][1], found[0][1]
+
+    def parse(self, query, doc=None):
+        tokens = tokenize(query)
+        with stage_timer('vocabulary'):
+            matches = self.matcher.match_tokens(tokens, query)
+
+        found_intents = {match.value for match in matches.get('intent', [])}
+        intent = next((i for i in self.intent_priority if i in found_intents), None)
+        explicit_intent = intent is not None
+        intent = intent or 'get_metric'
+
+        companies = tuple(dict.fromkeys(match.value for match in matches.get('company', [])))
+        company_score = 100.0 if companies else 0.0
+        company_spans = [(match.start, match.end) for match in matches.get('company', [])]
+        if not companies and self.semantic is not None:
+            # Curated aliases are a matrix product away; NER is a model pass
+            alias = self.semantic.match_alias(tokens)
+            if alias:
+                companies, company_score = (alias.company,), alias.score * 100
+                company_spans.append((alias.start, alias.end))
+        if not companies and self.company_fallback is not None:
+            with stage_timer('company_fallback'):
+                fallback = self.company_fallback(query, doc)
+            if fallback:
+                companies, company_score = (fallback[0],), fallback[1]
+
+        filters, spans = self.filters(query, matches.get('metric', []))
+        filtered = [match for match in matches.get('metric', [])
+                    if not any(start == match.start for start, _ in spans)]
+        metrics = tuple(dict.fromkeys(match.value for match in filtered))
+
+        # Numbers inside a filter ("revenue above $2000m") are not years or limits
+        free_tokens = [t for t in tokens if not any(start <= t[1] < end for start, end in spans)]
+        top, ascending = self.limit(free_tokens)
+        if not explicit_intent and (filters or top is not None):
+            intent, explicit_intent = 'ranking', True
+
+        with stage_timer('year'):
+            year_start, year_end = self.years(query, free_tokens)
+        if year_end is None:
+            year_start = year_end = self.default_year
+
+        slot_scores = {'company': company_score / 100, 'metric': 1.0 if metrics or filters else 0.0}
+        required = REQUIRED_SLOTS.get(intent, ())
+        if self.semantic is not None and not all(slot_scores[slot] for slot in required):
+            # Templates are matched on the words the vocabularies left over, and
+            # only fill empty slots: the metric, and the intent when no intent
+            # keyword was present. Company names are not part of the templates.
+            claimed = company_spans + [(match.start, match.end) for match in matches.get('metric', [])]
+            words = [token for token, start, _ in free_tokens if not any(s <= start < e for s, e in claimed)]
+            template = self.semantic.match_template(words)
+            if template:
+                if not explicit_intent:
+                    intent = template.intent
+                    required = REQUIRED_SLOTS.get(intent, ())
+                if not slot_scores['metric']:
+                    metrics, slot_scores['metric'] = (template.metric,), template.score
+        confidence = sum(slot_scores[slot] for slot in required) / len(required) if required else 1.0
+        if not explicit_intent:
+            confidence *= DEFAULT_INTENT_PENALTY
+
+        return ParsedQuery(intent, companies, metrics, year_start, year_end, filters, top, ascending,
+                           round(confidence, 3))
@@ -0,0 +1,100 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Query Plans over the Financial Data Store
+Client: Global Finance Corp (GFC)
+
+Turns a ParsedQuery that asks for a table (N companies x M metrics in a
+year, with filters, sort direction and a row limit) into a QueryPlan,
+and runs it as array operations on FinancialDataStore:
+
+    "top 10 companies by ROE in 2023 with margin above 20%"
+      -> QueryPlan(metrics=('roe',), year='2023', top=10,
+                   filters=(Filter('profit_margin', '>', 20.0),))
+
+Filtering and sorting happen on whole (year, metric) columns, so the cost
+does not grow with a Python loop over tickers.
+"""
+
+from dataclasses import dataclass
+
+from financial_store import python_values
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    What to select from the store
+
+    metrics are the output columns; the first one (or the first filter's
+    metric when none was asked for) orders the rows. Filters and the sort
+    are evaluated in year. An empty companies tuple means every company in
+    the store.
+    """
+    metrics: tuple
+    year: str
+    companies: tuple = ()
+    filters: tuple = ()
+    ascending: bool = False
+    top: int = None
+
+    @classmethod
+    def from_parsed(cls, parsed):
+        metrics = parsed.metrics
+        if not metrics and parsed.filters:
+            metrics = (parsed.filters[0].metric,)
+
+        # One company in a comparison ("compare Apple's revenue") is ranked
+        # against everyone; two or more are compared with each other
+        companies = parsed.companies
+        if parsed.intent in ('compare', 'ranking') and len(companies) < 2:
+            companies = ()
+
+        return cls(metrics, parsed.year_end, companies,
+                   parsed.filters, parsed.ascending, parsed.top)
+
+    @property
+    def sort_metric(self):
+        return self.metrics[0] if self.metrics else None
+
+    def execute(self, store):
+        rows = store.select(self.year, self.sort_metric, self.filters,
+                            companies=self.companies or None,
+                            ascending=self.ascending, top=self.top)
+        return PlanResult(store, self, rows)
+
+
+class PlanResult:
+    """
+    Rows selected by a QueryPlan, best first
+
+    Values are read from the store on demand, so a large selection costs
+    nothing until it is rendered.
+    """
+
+    def __init__(self, store, plan, rows):
+        self.store = store
+        self.plan = plan
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def companies(self):
+        return [self.store.companies[i] for i in self.rows]
+
+    def slice(self, start, stop):
+        """The same result restricted to rows[start:stop]"""
+        return PlanResult(self.store, self.plan, self.rows[start:stop])
+
+    def values(self, metric):
+        """float64 vector of metric in the plan's year, one per row (NaN when missing)"""
+        return self.store.values_at(self.rows, self.plan.year, metric)
+
+    def column(self, metric):
+        """Python values of metric in the plan's year, one per row (None when missing)"""
+        return python_values(self.values(metric), self.store.is_integral(metric))
+
+    def pairs(self, metric=None):
+        """(company, value) pairs for one metric (the sort metric by default)"""
+        return list(zip(self.companies, self.column(metric or self.plan.sort_metric)))
@@ -0,0 +1,392 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Semantic Fallback Index
+Client: Global Finance Corp (GFC)
+
+Paraphrases that the keyword vocabularies miss ("how much cash did
+Cupertino throw off") are matched against a small index built from
+Task2_Financial_Chatbot/semantic_templates.jsonl, one object per line:
+
+    {"template": "how much cash did {company} throw off", "intent": "get_metric", "metric": "cash_flow"}
+    {"alias": "cupertino", "company": "Apple"}
+
+Text is embedded without a model pass. Each word is a signed hash of its
+character n-grams (fastText-style subwords in HASH_DIM buckets), so
+inflections and small typos land close together; words are weighted by
+their rarity across the templates. An index built with --vectors MODEL
+(a spaCy package with word vectors, such as en_core_web_md) also keeps
+those vectors for a capped vocabulary and scores templates on both.
+
+The matrices are saved as .npy files beside a JSON manifest and loaded
+memory-mapped, like the financial data snapshot. A lookup is a brute-force
+cosine search (one matrix-vector product over a few hundred rows), well
+under a millisecond. The index is rebuilt when the templates file changes.
+
+    python semantic_index.py
+    python semantic_index.py --vectors en_core_web_md --vocab-size 20000
+    python semantic_index.py --query "how much cash did Cupertino throw off"
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentation import timed
+from vocabulary_matcher import tokenize
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATES_PATH = os.path.join(BASE_DIR, 'Task2_Financial_Chatbot', 'semantic_templates.jsonl')
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, 'Task2_Financial_Chatbot', '.cache')
+
+INDEX_VERSION = 1
+
+# Hashed subword embedding: buckets and character n-gram sizes
+HASH_DIM = 512
+NGRAM_SIZES = (3, 4, 5)
+
+# Minimum cosine similarity for a hit. Below the template thresholds the
+# parser leaves the slots empty and the bot falls back to its help reply; a
+# lone leftover word ("apple equity", "who makes the iphone") is thin
+# evidence, so it must sit much closer to a template than a phrase does
+ALIAS_THRESHOLD = 0.8
+TEMPLATE_THRESHOLD = 0.5
+SINGLE_WORD_THRESHOLD = 0.75
+
+# Words kept from a spaCy vectors table (template and alias words always are)
+DEFAULT_VOCAB_SIZE = 20000
+
+# Left out of template matching, and never an alias on their own
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'did', 'do', 'does', 'for', 'has', 'have', 'how', 'in', 'is', 'it', 'its',
+    'me', 'of', 'on', 'or', 'the', 'their', 'to', 'was', 'were', 'what', 'which', 'who', 'with',
+    # the year parser's business
+    'last', 'this', 'year', 'years',
+}
+
+_PLACEHOLDER = re.compile(r"\{\w+\}")
+
+AliasMatch = namedtuple('AliasMatch', ['company', 'score', 'start', 'end', 'alias'])
+TemplateMatch = namedtuple('TemplateMatch', ['intent', 'metric', 'score', 'template'])
+
+
+def _normalized(vec):
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word):
+    """Unit-length signed hash of a word and its character n-grams (read-only)"""
+    vec = np.zeros(HASH_DIM, dtype=np.float32)
+    padded = f"<{word}>"
+    grams = [padded] + [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    for gram in grams:
+        h = zlib.crc32(gram.encode('utf-8'))
+        vec[h % HASH_DIM] += 1.0 if h & 0x80000000 else -1.0
+    vec = _normalized(vec)
+    vec.setflags(write=False)
+    return vec
+
+
+def hashed_embedding(words, weights=None):
+    """Unit-length (weighted) sum of the words' hashed vectors; zeros for no words"""
+    vec = np.zeros(HASH_DIM, dtype=np.float32)
+    for i, word in enumerate(words):
+        vec += _word_vector(word) if weights is None else _word_vector(word) * weights[i]
+    return _normalized(vec)
+
+
+def _is_content(word):
+    return len(word) > 1 and not word.isdigit() and word not in STOP_WORDS
+
+
+def content_words(text):
+    """Tokens that carry meaning for template matching: no placeholders, numbers or stop words"""
+    return [token for token, _, _ in tokenize(_PLACEHOLDER.sub(' ', text)) if _is_content(token)]
+
+
+def load_entries(path=DEFAULT_TEMPLATES_PATH):
+    """([(intent, metric, template)], [(alias, company)]) from a JSON-lines templates file"""
+    templates, aliases = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if 'alias' in row:
+                aliases.append((row['alias'], row['company']))
+            else:
+                templates.append((row['intent'], row['metric'], row['template']))
+    return templates, aliases
+
+
+class SemanticIndex:
+    """
+    Nearest paraphrase template and nearest company alias for a query
+
+    template_vectors / alias_vectors hold one unit-length hashed embedding
+    per row; with word vectors, word_vectors is the vocabulary table and
+    template_word_vectors the templates embedded from it.
+    """
+
+    def __init__(self, templates, aliases, template_vectors, alias_vectors, idf,
+                 words=None, word_vectors=None, template_word_vectors=None):
+        self.templates = templates
+        self.aliases = aliases
+        self.template_vectors = template_vectors
+        self.alias_vectors = alias_vectors
+        self.idf = idf
+        self.default_idf = max(idf.values(), default=1.0)
+        self.max_alias_tokens = max((len(tokenize(alias)) for alias, _ in aliases), default=0)
+        self.word_rows = {word: i for i, word in enumerate(words or ())}
+        self.word_vectors = word_vectors
+        self.template_word_vectors = template_word_vectors
+
+    def weights(self, words):
+        return [self.idf.get(word, self.default_idf) for word in words]
+
+    def word_embedding(self, words, weights):
+        """Unit-length weighted mean of the words' table vectors, or None if none has one"""
+        rows = [(self.word_rows[word], weight) for word, weight in zip(words, weights) if word in self.word_rows]
+        if not rows:
+            return None
+        positions, row_weights = zip(*rows)
+        return _normalized(np.asarray(row_weights, dtype=np.float32) @ self.word_vectors[list(positions)])
+
+    @timed('semantic_alias')
+    def match_alias(self, tokens, threshold=ALIAS_THRESHOLD):
+        """
+        Best company alias among the spans of tokens (tokenize() output), or None
+
+        Spans of up to max_alias_tokens words are scored against every alias
+        at once; spans of stop words and numbers only are skipped.
+        """
+        words = [token for token, _, _ in tokens]
+        content = [word not in STOP_WORDS and not word.isdigit() for word in words]
+        spans = [(i, j) for i in range(len(words)) for j in range(i + 1, min(i + self.max_alias_tokens, len(words)) + 1)
+                 if any(content[i:j])]
+        if not spans:
+            return None
+
+        # Span vectors as differences of running sums over the word vectors
+        running = np.zeros((len(words) + 1, HASH_DIM), dtype=np.float32)
+        np.cumsum([_word_vector(word) for word in words], axis=0, out=running[1:])
+        starts, ends = np.array(spans).T
+        vectors = running[ends] - running[starts]
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        scores = vectors @ self.alias_vectors.T
+        rows = np.argmax(scores, axis=1)
+        best = scores[np.arange(len(spans)), rows]
+        # Equal scores (up to float noise) go to the longest span, so "the
+        # windows maker" is claimed whole rather than leaving "maker" behind
+        span = int(np.lexsort((starts - ends, -np.round(best, 4)))[0])
+        row = int(rows[span])
+        score = float(scores[span, row])
+        if score < threshold:
+            return None
+        (i, j), (alias, company) = spans[span], self.aliases[row]
+        return AliasMatch(company, score, tokens[i][1], tokens[j - 1][2], alias)
+
+    @timed('semantic_template')
+    def match_template(self, words, threshold=TEMPLATE_THRESHOLD, single_word_threshold=SINGLE_WORD_THRESHOLD):
+        """Nearest template to the content words of a query, or None below threshold"""
+        words = [word for word in words if _is_content(word)]
+        if not words:
+            return None
+        if len(words) == 1:
+            threshold = max(threshold, single_word_threshold)
+        weights = self.weights(words)
+        scores = self.template_vectors @ hashed_embedding(words, weights)
+        if self.word_vectors is not None:
+            vec = self.word_embedding(words, weights)
+            if vec is not None:
+                scores = (scores + self.template_word_vectors @ vec) / 2
+
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < threshold:
+            return None
+        intent, metric, template = self.templates[best]
+        return TemplateMatch(intent, metric, score, template)
+
+
+def _idf(documents):
+    """word -> log((1 + N) / (1 + document frequency)) + 1"""
+    df = {}
+    for words in documents:
+        for word in set(words):
+            df[word] = df.get(word, 0) + 1
+    n = len(documents)
+    return {word: math.log((1 + n) / (1 + count)) + 1 for word, count in df.items()}
+
+
+def _vector_table(model, required, vocab_size):
+    """(words, unit-length vectors) from a spaCy package's word vectors, required words first"""
+    import spacy
+
+    vocab = spacy.load(model).vocab
+    if not vocab.vectors.shape[0]:
+        raise ValueError(f"{model} has no word vectors")
+    words = [word for word in dict.fromkeys(required) if vocab.has_vector(word)]
+    seen = set(words)
+    for key in vocab.vectors.keys():
+        if len(words) >= vocab_size:
+            break
+        try:
+            word = vocab.strings[key]
+        except KeyError:
+            continue
+        if word.isalpha() and word.islower() and word not in seen:
+            seen.add(word)
+            words.append(word)
+    table = np.stack([vocab.get_vector(word) for word in words]).astype(np.float32)
+    norms = np.linalg.norm(table, axis=1, keepdims=True)
+    return words, table / np.where(norms, norms, 1)
+
+
+def _index_paths(templates_path, index_dir):
+    stem = os.path.splitext(os.path.basename(templates_path))[0]
+    return os.path.join(index_dir, stem + '.manifest.json'), stem
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_index(templates_path=DEFAULT_TEMPLATES_PATH, index_dir=DEFAULT_INDEX_DIR, vectors=None,
+                vocab_size=DEFAULT_VOCAB_SIZE):
+    """Embed the templates file and write its index (with vectors: a spaCy package name); returns the manifest"""
+    digest = _file_digest(templates_path)
+    templates, aliases = load_entries(templates_path)
+    documents = [content_words(template) for _, _, template in templates]
+    idf = _idf(documents)
+
+    arrays = {
+        'templates_file': np.stack([hashed_embedding(doc, [idf[word] for word in doc]) for doc in documents]),
+        'aliases_file': np.stack([hashed_embedding([token for token, _, _ in tokenize(alias)])
+                                  for alias, _ in aliases]),
+    }
+    words = None
+    if vectors:
+        words, table = _vector_table(vectors, [word for doc in documents for word in doc], vocab_size)
+        index = SemanticIndex(templates, aliases, None, None, idf, words, table)
+
+        def embed(doc):
+            vec = index.word_embedding(doc, index.weights(doc))
+            return np.zeros(table.shape[1], dtype=np.float32) if vec is None else vec
+
+        arrays['words_file'] = table
+        arrays['template_words_file'] = np.stack([embed(doc) for doc in documents])
+
+    manifest_path, stem = _index_paths(templates_path, index_dir)
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = {
+        'version': INDEX_VERSION,
+        'source': os.path.abspath(templates_path),
+        'source_sha256': digest,
+        'hash_dim': HASH_DIM,
+        'ngram_sizes': list(NGRAM_SIZES),
+        'vectors': vectors,
+        'templates': templates,
+        'aliases': aliases,
+        'idf': idf,
+        'words': words,
+    }
+    # Content-addressed matrices, so the manifest swap below is the commit point
+    for key, array in arrays.items():
+        name = f"{stem}.{digest[:16]}.{key[:-len('_file')]}.npy"
+        _write_atomic(os.path.join(index_dir, name), lambda f, array=array: np.save(f, array.astype(np.float32)))
+        manifest[key] = name
+    _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+    for name in os.listdir(index_dir):
+        if name.startswith(stem + '.') and name.endswith('.npy') and name not in manifest.values():
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except OSError:
+                pass
+    return manifest
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get('version') != INDEX_VERSION or manifest.get('hash_dim') != HASH_DIM
+            or manifest.get('ngram_sizes') != list(NGRAM_SIZES)):
+        return None
+    return manifest
+
+
+def load_index(templates_path=DEFAULT_TEMPLATES_PATH, index_dir=DEFAULT_INDEX_DIR, mmap=True):
+    """
+    Load the index of a templates file, rebuilding it when the file has changed
+
+    A rebuild keeps the word vectors the index was built with, and drops
+    them (with a warning) when that spaCy package is no longer installed.
+    """
+    manifest_path, _ = _index_paths(templates_path, index_dir)
+    manifest = _read_manifest(manifest_path)
+    files = ('templates_file', 'aliases_file', 'words_file', 'template_words_file')
+    if (manifest is None or manifest['source_sha256'] != _file_digest(templates_path)
+            or not all(os.path.exists(os.path.join(index_dir, manifest[key])) for key in files if key in manifest)):
+        vectors = manifest and manifest['vectors']
+        try:
+            manifest = build_index(templates_path, index_dir, vectors)
+        except (ImportError, OSError, ValueError) as exc:
+            if not vectors:
+                raise
+            print(f"⚠️  Semantic index built without {vectors} word vectors: {exc}")
+            manifest = build_index(templates_path, index_dir)
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {key: np.load(os.path.join(index_dir, manifest[key]), mmap_mode=mmap_mode)
+              for key in files if key in manifest}
+    return SemanticIndex([tuple(row) for row in manifest['templates']], [tuple(row) for row in manifest['aliases']],
+                         arrays['templates_file'], arrays['aliases_file'], manifest['idf'],
+                         manifest['words'], arrays.get('words_file'), arrays.get('template_words_file'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the chatbot's semantic fallback index")
+    parser.add_argument('--templates', default=DEFAULT_TEMPLATES_PATH, help="templates and aliases (JSON lines)")
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help="where the index is written")
+    parser.add_argument('--vectors', help="spaCy package with word vectors, e.g. en_core_web_md")
+    parser.add_argument('--vocab-size', type=int, default=DEFAULT_VOCAB_SIZE, help="words kept from --vectors")
+    parser.add_argument('--query', action='append', help="show the matches for a query (repeatable)")
+    args = parser.parse_args()
+
+    manifest = build_index(args.templates, args.index_dir, args.vectors, args.vocab_size)
+    words = f", {len(manifest['words']):,} word vectors" if manifest['words'] else ""
+    print(f"✅ {len(manifest['templates'])} templates, {len(manifest['aliases'])} aliases{words} "
+          f"in {args.index_dir}")
+
+    index = load_index(args.templates, args.index_dir)
+    for query in args.query or ():
+        tokens = tokenize(query)
+        alias = index.match_alias(tokens)
+        rest = [token for token, start, _ in tokens if alias is None or not alias.start <= start < alias.end]
+        print(f"\n{query!r}\n  alias:    {alias}\n  template: {index.match_template(rest, threshold=0.0, single_word_threshold=0.0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+BCG GenAI Consulting Project - Task 2 (Enhanced)
+Compiled Vocabulary Matcher
+Client: Global Finance Corp (GFC)
+
+Company aliases, metric synonyms and intent keywords are compiled once into
+a single phrase table keyed by token tuples. A query is tokenised once and
+every vocabulary is matched in the same left-to-right pass, so the cost per
+query depends on its length, not on how many phrases are registered.
+
+Matches respect word boundaries ("ms" does not match inside "terms") and,
+within one vocabulary, overlaps resolve to the longest phrase ("net income"
+beats "income"). A trailing plural "s"/"es" is tolerated ("margins").
+"""
+
+from collections import namedtuple
+
+# Shared with the canned-answer table, so both see the same words
+from Task2_Financial_Chatbot.canned_answers import TOKEN_PATTERN as _TOKEN, normalize_key as normalize
+
+Match = namedtuple('Match', ['kind', 'value', 'start', 'end', 'phrase'])
+
+
+def tokenize(text):
+    """Lower-case token list with (start, end) character offsets"""
+    return [(m.group(), m.start(), m.end()) for m in _TOKEN.finditer(text.lower())]
+
+
+class VocabularyMatcher:
+    """
+    Single-pass, longest-match phrase matcher over several vocabularies
+    """
+
+    def __init__(self):
+        # token tuple -> {kind: value}
+        self._phrases = {}
+        self._kinds = []
+        self.max_tokens = 0
+
+    def add(self, kind, phrase, value):
+        """Register a phrase; the first value registered for a phrase wins"""
+        key = tuple(token for token, _, _ in tokenize(phrase))
+        if not key:
+            return
+        if kind not in self._kinds:
+            self._kinds.append(kind)
+        self._phrases.setdefault(key, {}).setdefault(kind, value)
+        self.max_tokens = max(self.max_tokens, len(key))
+
+    def add_vocabulary(self, kind, mapping):
+        """Register {value: [phrases]} (metric synonyms, intent keywords)"""
+        for value, phrases in mapping.items():
+            for phrase in phrases:
+                self.add(kind, phrase, value)
+
+    def _lookup(self, key):
+        entry = self._phrases.get(key)
+        if entry is None:
+            last = key[-1]
+            # Tolerate plurals on the final word only
+            for suffix in ('es', 's'):
+                if len(last) > len(suffix) + 1 and last.endswith(suffix):
+                    entry = self._phrases.get(key[:-1] + (last[:-len(suffix)],))
+                    if entry is not None:
+                        break
+        return entry
+
+    def find_all(self, text):
+        """
+        Every match of every vocabulary, in query order.
+
+        Returns {kind: [Match, ...]} with non-overlapping matches per kind.
+        """
+        return self.match_tokens(tokenize(text), text)
+
+    def match_tokens(self, tokens, text):
+        """find_all() over tokens already produced by tokenize(text)"""
+        words = [token for token, _, _ in tokens]
+        matches = {kind: [] for kind in self._kinds}
+        next_free = dict.fromkeys(self._kinds, 0)
+
+        for i in range(len(words)):
+            pending = [kind for kind in self._kinds if next_free[kind] <= i]
+            if not pending:
+                continue
+            for n in range(min(self.max_tokens, len(words) - i), 0, -1):
+                entry = self._lookup(tuple(words[i:i + n]))
+                if entry is None:
+                    continue
+                for kind in pending:
+                    if kind in entry and next_free[kind] <= i:
+                        start, end = tokens[i][1], tokens[i + n - 1][2]
+                        matches[kind].append(Match(kind, entry[kind], start, end, text[start:end]))
+                        next_free[kind] = i + n
+                if all(next_free[kind] > i for kind in pending):
+                    break
+
+        return matches